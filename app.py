@@ -1,15 +1,40 @@
 import streamlit as st
 import os
+import importlib
+import pandas as pd
 import styles
+import database as db
+import instrumentacao
+import profiler
 from datetime import datetime
 
-# --- IMPORTS DOS NOVOS MÓDULOS ---
-# O Streamlit adiciona a raiz ao PATH, então isso funciona:
-from views import dashboard, vendas, compras, malas, produtos, clientes, financeiro, relatorios, fechamento, configuracoes
+# --- TELAS ---
+# Menu → (módulo, função). O módulo só é importado quando a tela é aberta,
+# então quem só usa a Venda Direta não carrega o plotly dos Relatórios.
+# O Streamlit adiciona a raiz ao PATH, então "views.xxx" funciona.
+TELAS = {
+    "Dashboard": ("views.dashboard", "show_dashboard"),
+    "Relatórios Avançados": ("views.relatorios", "show_relatorios"),
+    "Venda Direta": ("views.vendas", "show_venda_direta"),
+    "Pedido de Compra": ("views.compras", "show_compras"),
+    "Controle de Malas": ("views.malas", "show_malas"),
+    "Produtos": ("views.produtos", "show_produtos"),
+    "Clientes": ("views.clientes", "show_clientes"),
+    "Financeiro": ("views.financeiro", "show_financeiro"),
+    "Fechamento de Mês": ("views.fechamento", "show_fechamento"),
+    "Configurações": ("views.configuracoes", "show_configuracoes"),
+}
+
+def carregar_tela(menu):
+    modulo, funcao = TELAS[menu]
+    return getattr(importlib.import_module(modulo), funcao)
 
 # --- CONFIGURAÇÃO INICIAL ---
 st.set_page_config(page_title="FL Boutique - Gestão", layout="wide")
 
+# Marca o começo do rerun para o painel de diagnóstico
+marca_rodada = instrumentacao.inicio_rodada()
+
 # Aplica o CSS
 styles.apply_custom_style()
 
@@ -46,6 +71,14 @@ def check_password():
 
 if not check_password():
     st.stop()
+
+# Vendas/malas/compras que ficaram no meio (queda do app ou da planilha) são
+# desfeitas uma vez por sessão, antes de qualquer tela ler os dados
+if not st.session_state.get("operacoes_recuperadas"):
+    st.session_state["operacoes_recuperadas"] = True
+    desfeitas = db.recuperar_operacoes()
+    if desfeitas:
+        st.warning(f"{desfeitas} operação(ões) interrompida(s) foram desfeitas. Confira e refaça se necessário.")
  
 
 # --- SIDEBAR E NAVEGAÇÃO ---
@@ -58,18 +91,7 @@ with st.sidebar:
     st.write(f"Olá! Hoje é {datetime.now().strftime('%d/%m')}")
     st.divider()
     
-    menu = st.radio("Navegação", [
-        "Dashboard", 
-        "Relatórios Avançados",
-        "Venda Direta", 
-        "Pedido de Compra", 
-        "Controle de Malas", 
-        "Produtos", 
-        "Clientes", 
-        "Financeiro",
-        "Fechamento de Mês",
-        "Configurações"
-    ])
+    menu = st.radio("Navegação", list(TELAS))
 
     st.divider()
     if st.button("Sair"):
@@ -77,23 +99,23 @@ with st.sidebar:
         st.rerun()
 
 # --- ROTEAMENTO DE TELAS ---
-if menu == "Dashboard":
-    dashboard.show_dashboard()
-elif menu == "Relatórios Avançados": # <--- ROTA NOVA
-    relatorios.show_relatorios()
-elif menu == "Venda Direta":
-    vendas.show_venda_direta()
-elif menu == "Pedido de Compra":
-    compras.show_compras()
-elif menu == "Controle de Malas":
-    malas.show_malas()
-elif menu == "Produtos":
-    produtos.show_produtos()
-elif menu == "Clientes":
-    clientes.show_clientes()
-elif menu == "Financeiro":
-    financeiro.show_financeiro()
-elif menu == "Fechamento de Mês":
-    fechamento.show_fechamento()
-elif menu == "Configurações":
-    configuracoes.show_configuracoes()
+# Com o perfil ligado, mede a tela e mostra busca/transformação/render
+profiler.executar(carregar_tela(menu), menu)
+
+# --- DIAGNÓSTICO (só com FL_INSTRUMENTAR ligado) ---
+if db.INSTRUMENTAR:
+    with st.expander("🩺 Diagnóstico da Planilha", expanded=False):
+        chamadas = instrumentacao.chamadas_da_rodada(marca_rodada)
+        no_minuto = instrumentacao.ultimo_minuto()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Chamadas neste rerun", len(chamadas))
+        c2.metric("Tempo na API", f"{sum(c['ms'] for c in chamadas):.0f} ms")
+        c3.metric("Últimos 60 s", f"{no_minuto} / {instrumentacao.COTA_POR_MINUTO}")
+        if no_minuto >= instrumentacao.COTA_POR_MINUTO * 0.8:
+            st.warning("Perto da cota de requisições por minuto do Google Sheets.")
+        if chamadas:
+            st.dataframe(chamadas, column_order=["operacao", "aba", "ms", "bytes", "tela", "erro"],
+                         use_container_width=True, hide_index=True)
+        st.caption("Requisições por minuto (todas as sessões)")
+        por_minuto = pd.DataFrame(instrumentacao.requisicoes_por_minuto(), columns=["minuto", "requisições"])
+        st.bar_chart(por_minuto.set_index("minuto"))
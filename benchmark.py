@@ -0,0 +1,253 @@
+"""
+Benchmark da camada de dados e dos pipelines das telas, sem rede.
+
+Gera as abas Produtos, Clientes, Malas e Financeiro com dados sintéticos na
+planilha local (planilha_local.py), mede cada caminho e conta as requisições
+à "planilha" feitas por ação. O resultado é um JSON que pode ser comparado
+entre commits:
+
+    python benchmark.py --saida antes.json
+    (muda o código)
+    python benchmark.py --saida depois.json
+    python benchmark.py --comparar antes.json depois.json
+
+Opções úteis: --tamanhos 1000,10000  --repeticoes 3  --latencia-ms 80
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+NOMES = ["Blusa Canelada", "Calça Jeans", "Vestido Midi", "Saia Plissada", "Camisa Linho",
+         "Short Alfaiataria", "Cropped Tricô", "Macacão", "Jaqueta Couro", "Body Renda",
+         "Regata Básica", "Blazer", "Kimono", "Conjunto Moletom", "Cardigan"]
+TAMANHOS = ["PP", "P", "M", "G", "GG", "Único"]
+FORMAS = ["Pix", "Dinheiro", "Cartão de Crédito", "Cartão de Débito"]
+
+
+# --- DADOS SINTÉTICOS ---
+
+def gerar_abas(pasta, n, semente=42):
+    """Grava os CSVs da planilha local com `n` linhas em cada aba principal."""
+    import planilha_local
+    rnd = random.Random(semente)
+    hoje = date.today()
+
+    produtos = []
+    for i in range(n):
+        custo = round(rnd.uniform(15, 120), 2)
+        status = rnd.choices(["Disponível", "Vendido", "Em Mala"], [6, 3, 1])[0]
+        produtos.append([str(uuid.UUID(int=rnd.getrandbits(128))), rnd.choice(NOMES), rnd.choice(TAMANHOS),
+                         f"{custo:.2f}", f"{custo * 2.4:.2f}", status])
+
+    clientes = [[str(uuid.UUID(int=rnd.getrandbits(128))), f"Cliente {i:06d}", f"119{i:08d}", f"Rua {i}"]
+                for i in range(n)]
+
+    em_mala = [p[0] for p in produtos if p[5] == "Em Mala"] or [produtos[0][0]]
+    malas = []
+    for i in range(n):
+        cli = rnd.choice(clientes)
+        envio = hoje - timedelta(days=rnd.randint(0, 365))
+        malas.append([str(uuid.UUID(int=rnd.getrandbits(128))), cli[0], cli[1], envio.isoformat(),
+                      ",".join(rnd.sample(em_mala, min(8, len(em_mala)))),
+                      rnd.choice(["Aberta", "Finalizada", "Cancelada"]), (envio + timedelta(days=7)).isoformat()])
+
+    financeiro = []
+    for i in range(n):
+        lanc = hoje - timedelta(days=rnd.randint(0, 730))
+        tipo = rnd.choices(["Venda", "Despesa", "Entrada"], [7, 2, 1])[0]
+        financeiro.append([str(uuid.UUID(int=rnd.getrandbits(128))), lanc.isoformat(),
+                           (lanc + timedelta(days=30 * rnd.randint(0, 3))).isoformat(), tipo,
+                           f"Venda Loja - {rnd.choice(clientes)[1]} (1/1)" if tipo == "Venda" else "Lançamento",
+                           f"{rnd.uniform(20, 900):.2f}", rnd.choice(FORMAS), rnd.choice(["Pago", "Pendente"])])
+
+    abas = {"Produtos": produtos, "Clientes": clientes, "Malas": malas, "Financeiro": financeiro,
+            "Fechamentos": [], "Configuracoes": [["taxa_cartao", 12], ["custo_fixo", 1.06],
+                                                 ["markup", 2], ["taxa_extra", 1.12]]}
+    for aba, linhas in abas.items():
+        with open(os.path.join(pasta, f"{aba}.csv"), "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(planilha_local.CABECALHOS[aba])
+            w.writerows(linhas)
+    return abas
+
+
+# --- MEDIÇÃO ---
+
+def _medir(nome, linhas, funcao, repeticoes, conn, preparar=None):
+    """Roda `funcao` várias vezes; guarda mediana/mínimo em ms e as requisições por execução."""
+    tempos, chamadas = [], []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        conn.zerar_contadores()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        chamadas.append(conn.total_chamadas())
+    return {
+        "caminho": nome,
+        "linhas": linhas,
+        "ms_mediana": round(statistics.median(tempos), 3),
+        "ms_min": round(min(tempos), 3),
+        "chamadas_api": max(chamadas),
+    }
+
+
+def rodar(tamanhos, repeticoes, latencia_ms):
+    resultados = []
+    for n in tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            abas = gerar_abas(pasta, n)
+            resultados.extend(_rodar_tamanho(pasta, n, abas, repeticoes, latencia_ms))
+    return resultados
+
+
+def _rodar_tamanho(pasta, n, abas, repeticoes, latencia_ms):
+    # O database.py lê a configuração na importação: aponta para a pasta gerada
+    os.environ.update({"FL_PLANILHA": "local", "FL_PLANILHA_DIR": pasta,
+                       "FL_LATENCIA_MS": str(latencia_ms), "FL_ESPELHO_SQLITE": "0", "FL_WRITE_BEHIND": "0",
+                       "FL_DIARIO_CAMINHO": os.path.join(pasta, "operacoes.db")})
+    for modulo in ("database", "utils", "kpis", "estoque", "busca", "views.malas", "views.relatorios"):
+        sys.modules.pop(modulo, None)
+    import database as db
+    import busca
+    import estoque
+    import kpis
+    import utils as ut
+    from views import malas, relatorios
+
+    # get_connection é st.cache_resource: sem limpar, voltaria a planilha do tamanho anterior
+    db.get_connection.clear()
+    db.get_diario.clear()
+    conn = db.get_connection()
+    frio = lambda: db.invalidar_cache()
+    r = []
+
+    for aba in ("Produtos", "Clientes", "Malas", "Financeiro"):
+        r.append(_medir(f"load_data[{aba}] (frio)", n, lambda: db.load_data(aba), repeticoes, conn, frio))
+        r.append(_medir(f"load_data[{aba}] (cache)", n, lambda: db.load_data(aba), repeticoes, conn))
+    r.append(_medir("load_typed_data[Financeiro] (frio)", n,
+                    lambda: db.load_typed_data("Financeiro"), repeticoes, conn, frio))
+
+    # Escrita: baixa de 20 peças (uma venda grande / retorno de mala)
+    ids = [p[0] for p in abas["Produtos"][:20]]
+    r.append(_medir("update_product_status_batch (20 ids)", n,
+                    lambda: db.update_product_status_batch({i: "Vendido" for i in ids}), repeticoes, conn))
+
+    df_fin = db.load_typed_data("Financeiro")
+    df_prod = db.load_typed_data("Produtos")
+    r.append(_medir("dashboard: calcular_kpis", n, lambda: kpis.calcular_kpis(df_fin, df_prod), repeticoes, conn))
+
+    def etl_relatorios():
+        fin = relatorios.preparar_financeiro(df_fin)
+        relatorios.montar_dre(fin)
+        relatorios.ranking_clientes(fin)
+    r.append(_medir("relatorios: DRE + ranking", n, etl_relatorios, repeticoes, conn))
+
+    df_p = db.load_data("Produtos")
+    r.append(_medir("vendas: montar índice de estoque", n,
+                    lambda: estoque.IndiceEstoque.de_produtos(df_p), repeticoes, conn))
+    indice = estoque.IndiceEstoque.de_produtos(df_p)
+    def opcoes_e_carrinho():
+        skus = indice.skus()
+        [indice.quantidade(s) for s in skus]
+        indice.alocar([(s, 1) for s in skus[:10]])
+    r.append(_medir("vendas: opções + alocação do carrinho", n, opcoes_e_carrinho, repeticoes, conn))
+
+    # Fechamento de venda: reserva de 3 peças + 2 parcelas no Financeiro (Transacao)
+    def checkout():
+        baixa, _ = db.get_indice_estoque().alocar([(s, 1) for s in db.get_indice_estoque().skus()[:3]])
+        venda = db.Transacao("Venda benchmark").reservar(baixa)
+        venda.incluir("Financeiro", ut.gerar_lancamentos(300, 2, "Pix", "Cliente", "Venda Loja", datetime.now(), tipo="Venda"))
+        venda.confirmar()
+    r.append(_medir("vendas: checkout (Transacao)", n, checkout, repeticoes, conn))
+
+    # Seletores: índice de busca das peças e uma consulta digitada
+    r.append(_medir("busca: montar índice de peças", n,
+                    lambda: busca.IndiceBusca([db._entrada_peca(i, nm, t) for i, nm, t
+                                               in zip(df_p['id'], df_p['nome'], df_p['tamanho'])]),
+                    repeticoes, conn))
+    indice_busca = db.get_busca_produtos()
+    r.append(_medir("busca: consulta 'cal m'", n, lambda: indice_busca.buscar("cal m"), repeticoes, conn))
+
+    # Retorno de mala: metade devolvida, metade vendida, com a gravação
+    lids = abas["Malas"][0][4].split(",")
+    devs = {pid: i % 2 == 0 for i, pid in enumerate(lids)}
+    def retorno_mala():
+        upd, _ = malas.apurar_retorno(db.load_indexed_data("Produtos"), devs)
+        db.update_product_status_batch(upd)
+    r.append(_medir(f"malas: retorno ({len(lids)} peças)", n, retorno_mala, repeticoes, conn))
+    return r
+
+
+# --- SAÍDA / COMPARAÇÃO ---
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def comparar(antes, depois):
+    with open(antes, encoding="utf-8") as f:
+        a = {(x["caminho"], x["linhas"]): x for x in json.load(f)["resultados"]}
+    with open(depois, encoding="utf-8") as f:
+        d = json.load(f)["resultados"]
+    print(f"{'caminho':45} {'linhas':>7} {'antes ms':>10} {'depois ms':>10} {'razão':>7} {'api':>9}")
+    for x in d:
+        y = a.get((x["caminho"], x["linhas"]))
+        if not y:
+            print(f"{x['caminho']:45} {x['linhas']:>7} {'-':>10} {x['ms_mediana']:>10.1f} {'novo':>7}")
+            continue
+        razao = y["ms_mediana"] / x["ms_mediana"] if x["ms_mediana"] else float("inf")
+        api = f"{y['chamadas_api']}→{x['chamadas_api']}"
+        print(f"{x['caminho']:45} {x['linhas']:>7} {y['ms_mediana']:>10.1f} {x['ms_mediana']:>10.1f} {razao:>6.2f}x {api:>9}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark do FL Boutique (planilha local).")
+    p.add_argument("--tamanhos", default="1000,10000,100000", help="linhas por aba, separadas por vírgula")
+    p.add_argument("--repeticoes", type=int, default=5)
+    p.add_argument("--latencia-ms", type=float, default=0, help="latência artificial por requisição")
+    p.add_argument("--saida", help="arquivo JSON de resultado (padrão: imprime na tela)")
+    p.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois resultados")
+    args = p.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultados = rodar([int(t) for t in args.tamanhos.split(",")], args.repeticoes, args.latencia_ms)
+    import pandas as pd
+    saida = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "latencia_ms": args.latencia_ms,
+        "repeticoes": args.repeticoes,
+        "resultados": resultados,
+    }
+    texto = json.dumps(saida, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+        for x in resultados:
+            print(f"{x['caminho']:45} {x['linhas']:>7} {x['ms_mediana']:>10.1f} ms {x['chamadas_api']:>4} req")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
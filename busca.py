@@ -0,0 +1,129 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+import streamlit as st
+
+# Quantas opções vão para o navegador por seletor
+LIMITE = 30
+
+_PALAVRA = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=8192)  # nomes se repetem muito (várias peças do mesmo modelo)
+def normalizar(texto):
+    """Minúsculas e sem acento: 'Calça' → 'calca'."""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def _palavras(texto):
+    return _PALAVRA.findall(normalizar(str(texto)))
+
+
+class IndiceBusca:
+    """
+    Índice de palavras (sem acento) dos rótulos de uma aba, para os seletores
+    mandarem ao navegador só as primeiras opções que batem com o que foi
+    digitado, e não a aba inteira.
+
+    Cada palavra da consulta é prefixo de alguma palavra do rótulo
+    ('cal m' acha 'Calça Jeans M'). Os resultados saem em ordem alfabética
+    do rótulo. Montado uma vez por versão da aba (db.get_busca_*).
+    """
+
+    def __init__(self, entradas):
+        # entradas: [(chave, rótulo)] ou [(chave, rótulo, texto buscável)] quando
+        # o rótulo tem partes que não devem bater na busca (ex.: pedaço do id).
+        # A posição na lista ordenada é o "documento".
+        ordenadas = sorted(((e[0], e[1], e[2] if len(e) > 2 else e[1]) for e in entradas),
+                           key=lambda e: (normalizar(str(e[2])), str(e[1])))
+        self._chaves = [c for c, _, _ in ordenadas]
+        self._rotulos = {c: r for c, r, _ in ordenadas}
+        postagens = {}
+        for doc, (_, _, texto) in enumerate(ordenadas):
+            for palavra in set(_palavras(texto)):
+                postagens.setdefault(palavra, []).append(doc)
+        self._palavras = sorted(postagens)
+        self._postagens = [postagens[p] for p in self._palavras]
+
+    def __len__(self):
+        return len(self._chaves)
+
+    def __contains__(self, chave):
+        return chave in self._rotulos
+
+    def rotulo(self, chave):
+        return self._rotulos.get(chave, str(chave))
+
+    def _docs_com_prefixo(self, prefixo):
+        inicio = bisect_left(self._palavras, prefixo)
+        fim = bisect_left(self._palavras, prefixo + "\uffff", inicio)
+        docs = set()
+        for lista in self._postagens[inicio:fim]:
+            docs.update(lista)
+        return docs
+
+    def buscar(self, consulta, limite=LIMITE, aceitar=None):
+        """
+        (chaves das primeiras `limite` opções que batem, total de resultados).
+        `aceitar(chave)` descarta resultados na hora da consulta (ex.: SKUs
+        sem estoque), sem remontar o índice.
+        """
+        termos = sorted(set(_palavras(consulta or "")), key=len, reverse=True)
+        if not termos:
+            if aceitar is None:
+                return self._chaves[:limite], len(self._chaves)
+            aceitas = [c for c in self._chaves if aceitar(c)]
+            return aceitas[:limite], len(aceitas)
+        # Começa pelo termo mais longo (em geral o que filtra mais)
+        docs = self._docs_com_prefixo(termos[0])
+        for termo in termos[1:]:
+            if not docs:
+                break
+            docs &= self._docs_com_prefixo(termo)
+        if aceitar is not None:
+            docs = {d for d in docs if aceitar(self._chaves[d])}
+        return [self._chaves[d] for d in heapq.nsmallest(limite, docs)], len(docs)
+
+
+# --- COMPONENTES ---
+
+def _aviso(mostradas, total):
+    if total > mostradas:
+        st.caption(f"Mostrando {mostradas} de {total}. Digite mais para refinar.")
+
+
+def caixa_busca(rotulo, indice, key, limite=LIMITE, formato=None, aceitar=None):
+    """
+    Campo de busca + selectbox só com os resultados. Retorna a chave
+    escolhida (ou None se nada bateu). `formato` troca o texto das opções
+    (padrão: o rótulo do índice); `aceitar` vai para o IndiceBusca.buscar.
+    """
+    consulta = st.text_input(f"🔎 {rotulo}", key=f"{key}_q", placeholder="Digite para buscar...")
+    chaves, total = indice.buscar(consulta, limite, aceitar)
+    if not chaves:
+        st.caption("Nenhum resultado.")
+        return None
+    escolha = st.selectbox(rotulo, chaves, format_func=formato or indice.rotulo, key=key, label_visibility="collapsed")
+    _aviso(len(chaves), total)
+    return escolha
+
+
+def multi_busca(rotulo, indice, key, limite=LIMITE):
+    """
+    Campo de busca + multiselect. As opções são os resultados da busca mais
+    o que já foi escolhido (a seleção sobrevive a uma nova consulta).
+    """
+    consulta = st.text_input(f"🔎 {rotulo}", key=f"{key}_q", placeholder="Digite para buscar...")
+    chaves, total = indice.buscar(consulta, limite)
+    # Some da seleção o que saiu do índice (ex.: peça vendida por outra sessão)
+    escolhidas = [c for c in st.session_state.get(key, []) if c in indice]
+    st.session_state[key] = escolhidas
+    ja = set(escolhidas)
+    opcoes = escolhidas + [c for c in chaves if c not in ja]
+    selecao = st.multiselect(rotulo, opcoes, format_func=indice.rotulo, key=key, label_visibility="collapsed")
+    _aviso(len(chaves), total)
+    return selecao
@@ -3,11 +3,84 @@ import pandas as pd
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from gspread.cell import Cell # <--- IMPORTANTE: NECESSÁRIO PARA O BATCH
+from gspread.utils import numericise_all, rowcol_to_a1
 import os
 import time
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+import local_store
+import planilha_local
+import instrumentacao
+import estoque
+import busca
+import utils as ut
+
+# --- PARÂMETROS (variável de ambiente ou st.secrets) ---
+def _config(chave, padrao=None):
+    """Lê um parâmetro primeiro do ambiente e depois do st.secrets."""
+    valor = os.environ.get(chave)
+    if valor is None:
+        try:
+            valor = st.secrets.get(chave)
+        except Exception:
+            valor = None
+    return padrao if valor is None else valor
+
+# Tempo (segundos) que uma aba lida fica em memória antes de ser baixada de novo
+CACHE_TTL = float(_config("FL_CACHE_TTL", 60))
+
+def _ligado(chave):
+    return str(_config(chave, "0")).lower() in ("1", "true", "sim")
+
+# Write-behind: as escritas voltam na hora e uma thread envia para a planilha
+USAR_WRITE_BEHIND = _ligado("FL_WRITE_BEHIND")
+# Intervalo máximo (segundos) entre dois envios da fila
+FLUSH_INTERVALO = float(_config("FL_FLUSH_INTERVALO", 2))
+# Espera (segundos) após uma escrita para juntar a rajada num envio só
+FLUSH_ATRASO = float(_config("FL_FLUSH_ATRASO", 0.5))
+
+# Espelho local: as leituras saem de uma cópia SQLite da planilha.
+# O write-behind depende dele (a tela precisa enxergar o que ainda está na fila).
+USAR_ESPELHO = _ligado("FL_ESPELHO_SQLITE") or USAR_WRITE_BEHIND
+SQLITE_CAMINHO = _config("FL_SQLITE_CAMINHO", "fl_boutique_local.db")
+# Intervalo (segundos) entre as consultas à planilha para trazer alterações
+SYNC_INTERVALO = float(_config("FL_SYNC_INTERVALO", 30))
+# Recusas da planilha (fora cota/rede) até uma pendência sair da fila
+PENDENCIA_TENTATIVAS = int(_config("FL_PENDENCIA_TENTATIVAS", 3))
+# Validade (segundos) da lista de meses fechados; curta para enxergar logo
+# um fechamento feito em outra sessão
+FECHAMENTO_TTL = float(_config("FL_FECHAMENTO_TTL", 15))
+# Abas baixadas aos poucos: intervalo (segundos) entre duas cargas completas
+RECARGA_COMPLETA = float(_config("FL_RECARGA_COMPLETA", 600))
+
+# Registra cada chamada às abas (operação, latência, bytes, tela) para o
+# painel de diagnóstico. Desligado, as abas não são envolvidas e não custa nada.
+INSTRUMENTAR = _ligado("FL_INSTRUMENTAR")
+
+# Perfil (cProfile) de cada tela para todas as sessões; também dá para ligar
+# só na sessão atual em Configurações
+PERFILAR = _ligado("FL_PERFIL")
+
+# Planilha usada pelo app: "google" (padrão) ou "local" (CSVs em FL_PLANILHA_DIR,
+# para desenvolver e medir sem rede nem credenciais)
+PLANILHA = str(_config("FL_PLANILHA", "google")).lower()
+
+# Diário local das operações de várias abas (database.Transacao). Operações
+# que ficaram no meio há mais de RECUPERAR_APOS segundos são desfeitas por
+# recuperar_operacoes()
+DIARIO_CAMINHO = _config("FL_DIARIO_CAMINHO", "fl_boutique_operacoes.db")
+RECUPERAR_APOS = float(_config("FL_RECUPERAR_APOS", 300))
 
 @st.cache_resource
 def get_connection():
+    if PLANILHA == "local":
+        return planilha_local.PlanilhaLocal(
+            _config("FL_PLANILHA_DIR", "planilha_local"),
+            latencia_ms=float(_config("FL_LATENCIA_MS", 0)),
+            cota_por_minuto=int(_config("FL_COTA_POR_MINUTO", 0)),
+        )
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     try:
         if os.path.exists("credentials.json"):
@@ -24,209 +97,1442 @@ def get_connection():
         st.error(f"🚨 Falha na Conexão: {e}")
         return None
 
+@st.cache_resource
+def get_espelho():
+    return local_store.EspelhoLocal(SQLITE_CAMINHO)
+
+@st.cache_resource
+def get_diario():
+    return local_store.DiarioOperacoes(DIARIO_CAMINHO)
+
+# --- CACHE DE LEITURA POR ABA ---
+# { 'Produtos': {'tempo': momento_da_leitura, 'df': DataFrame, 'derivados': {...}} }
+# Fica no processo (compartilhado entre sessões) e cada escrita invalida
+# apenas a aba que alterou.
+_cache_abas = {}
+_cache_lock = threading.Lock()
+
+def invalidar_cache(*sheet_names):
+    """Descarta o cache das abas informadas (ou de todas, se nenhuma for passada)."""
+    with _cache_lock:
+        if not sheet_names:
+            _cache_abas.clear()
+        for nome in sheet_names:
+            _cache_abas.pop(nome, None)
+
+# Objetos Worksheet já abertos: conn.worksheet() custa uma requisição de metadados
+_worksheets = {}
+
+def _worksheet(conn, sheet_name):
+    chave = (id(conn), sheet_name)
+    ws = _worksheets.get(chave)
+    if ws is None:
+        if INSTRUMENTAR:
+            # Abrir a aba é uma leitura de metadados: também entra na conta da cota
+            ws = instrumentacao.AbaInstrumentada(
+                instrumentacao.medir("worksheet", sheet_name, conn.worksheet, sheet_name))
+        else:
+            ws = conn.worksheet(sheet_name)
+        _worksheets[chave] = ws
+    return ws
+
+def _baixar_aba(conn, sheet_name):
+    """
+    Baixa a aba inteira numa requisição. Retorna (cabeçalho, linhas) com os
+    números convertidos do mesmo jeito que o get_all_records faz.
+    Aproveita a leitura para renovar o índice id → linha da aba.
+    """
+    valores = _worksheet(conn, sheet_name).get_all_values()
+    if not valores:
+        return [], []
+    cab = valores[0]
+    linhas = [numericise_all((l + [""] * len(cab))[:len(cab)]) for l in valores[1:]]
+    _registrar_cabecalho(sheet_name, cab)
+    _registrar_indice(sheet_name, [l[0] if l else "" for l in valores[1:]])
+    return cab, linhas
+
+# --- CARGA INCREMENTAL ---
+# Abas que só crescem no fim (uma linha por parcela no Financeiro, uma por
+# mala, uma por mês fechado). Para cada uma, as colunas que o app altera no
+# lugar (confirmar_recebimento, retorno de mala, reabrir mês). Vale para o
+# load_data direto e para a sincronização do espelho, que depois de cada envio
+# do próprio app baixaria a aba inteira de novo.
+# Edições feitas direto na planilha em outras colunas (ex.: descricao,
+# data_vencimento, lista_ids_produtos) só aparecem na próxima carga completa:
+# até RECARGA_COMPLETA segundos, ou já no "Sincronizar Agora".
+ABAS_INCREMENTAIS = {
+    "Financeiro": ("valor", "status_pagamento"),
+    "Malas": ("status",),
+    "Fechamentos": ("status",),
+}
+
+# { 'Financeiro': {'cab': [...], 'linhas': [[...], ...], 'versao': ..., 'completa_em': t} }
+# Fica fora do _cache_abas: invalidar o cache após uma escrita não pode
+# jogar fora a base, senão toda venda voltaria a baixar o livro inteiro.
+_bases = {}
+# Uma trava por aba: duas sessões atualizando a mesma base ao mesmo tempo
+# estenderiam a lista de linhas duas vezes (linhas novas duplicadas)
+_bases_travas = {}
+_bases_travas_lock = threading.Lock()
+
+def _trava_base(sheet_name):
+    with _bases_travas_lock:
+        return _bases_travas.setdefault(sheet_name, threading.Lock())
+
+def _letra(col):
+    """Letra da coluna (1 → 'A')."""
+    return rowcol_to_a1(1, col)[:-1]
+
+def _sem_vazios_finais(valores):
+    valores = list(valores)
+    while valores and valores[-1] == "":
+        valores.pop()
+    return valores
+
+def _base_apos_escrita(sheet_name):
+    """
+    Escrita do app numa aba incremental: a próxima carga confere a planilha
+    mesmo que a versão do Drive ainda não tenha mudado (o lastUpdateTime pode
+    demorar a acompanhar a escrita).
+    """
+    base = _bases.get(sheet_name)
+    if base is not None:
+        base["versao"] = None
+
+def _base_apos_update(sheet_name, colunas):
+    """Coluna fora das vigiadas alterada pelo app: a carga incremental não veria a mudança."""
+    vigiadas = ABAS_INCREMENTAIS.get(sheet_name)
+    if vigiadas is not None and any(c not in vigiadas for c in colunas):
+        _bases.pop(sheet_name, None)
+    else:
+        _base_apos_escrita(sheet_name)
+
+def _baixar(conn, sheet_name):
+    """Baixa a aba: inteira, ou só o que mudou se for uma das ABAS_INCREMENTAIS."""
+    if sheet_name in ABAS_INCREMENTAIS:
+        return _baixar_incremental(conn, sheet_name)
+    return _baixar_aba(conn, sheet_name)
+
+def _carga_completa(conn, sheet_name, versao):
+    cab, linhas = _baixar_aba(conn, sheet_name)
+    _bases[sheet_name] = {"cab": cab, "linhas": linhas, "versao": versao, "completa_em": time.time()}
+    return cab, [list(l) for l in linhas]
+
+def _baixar_incremental(conn, sheet_name):
+    """
+    Atualiza a base já conhecida da aba com um único batch_get:
+      - linha 1, para saber se o cabeçalho mudou;
+      - a célula A da última linha conhecida (âncora): se o id não bate,
+        alguma linha foi apagada ou movida;
+      - as linhas depois da última conhecida (as novas);
+      - as colunas alteradas no lugar (ABAS_INCREMENTAIS), só até a última
+        linha conhecida, para aplicar mudanças de valor/status.
+    Cabeçalho ou âncora diferentes, ou base com mais de RECARGA_COMPLETA
+    segundos, fazem a carga completa. Se a versão da planilha no Drive não
+    mudou, nada é baixado. A base é alterada no lugar, sob a trava da aba.
+    """
+    with _trava_base(sheet_name):
+        return _mesclar_incremental(conn, sheet_name)
+
+def _mesclar_incremental(conn, sheet_name):
+    versao = _versao_planilha(conn)
+    base = _bases.get(sheet_name)
+    if not base or not base["cab"] or time.time() - base["completa_em"] > RECARGA_COMPLETA:
+        return _carga_completa(conn, sheet_name, versao)
+    cab, linhas = base["cab"], base["linhas"]
+    if versao and versao == base["versao"]:
+        return cab, [list(l) for l in linhas]
+
+    n = len(linhas)
+    ultima = _letra(len(cab))
+    vigiadas = [cab.index(c) for c in ABAS_INCREMENTAIS[sheet_name] if c in cab]
+    faixas = [f"A1:{ultima}1", f"A{n + 1}", f"A{n + 2}:{ultima}"]
+    faixas += [f"{_letra(i + 1)}2:{_letra(i + 1)}{n + 1}" for i in vigiadas]
+    cab_atual, ancora, novas, *colunas = _worksheet(conn, sheet_name).batch_get(faixas)
+
+    esperado = linhas[-1][0] if linhas else cab[0]
+    ancora = ancora[0][0] if ancora and ancora[0] else ""
+    if (_sem_vazios_finais(cab_atual[0] if cab_atual else []) != _sem_vazios_finais(cab)
+            or str(numericise_all([ancora])[0]) != str(esperado)):
+        return _carga_completa(conn, sheet_name, versao)
+
+    # Valores/status alterados no lugar: troca só as células que mudaram
+    for i, faixa in zip(vigiadas, colunas):
+        valores = [l[0] if l else "" for l in faixa] + [""] * (n - len(faixa))
+        for linha, novo in zip(linhas, numericise_all(valores)):
+            if linha[i] != novo:
+                linha[i] = novo
+
+    linhas.extend(numericise_all((l + [""] * len(cab))[:len(cab)]) for l in novas)
+    base["versao"] = versao
+    _registrar_cabecalho(sheet_name, cab)
+    _registrar_indice(sheet_name, [l[0] for l in linhas])
+    return cab, [list(l) for l in linhas]
+
+# --- CABEÇALHOS (REGISTRO DE COLUNAS) ---
+# { 'Produtos': (momento, ['id', 'nome', 'tamanho', ...]) }
+# Permite atualizar por nome de coluna sem uma leitura a mais da linha 1.
+# Renovado em toda leitura completa da aba e na conferência que antecede as
+# escritas em linhas existentes (a linha 1 vai no mesmo batch_get), então se
+# alguém reordenar as colunas na planilha o app escreve nas posições novas.
+_cabecalhos = {}
+
+def _registrar_cabecalho(sheet_name, cab):
+    _cabecalhos[sheet_name] = (time.time(), list(cab))
+
+def _cabecalho(ws, sheet_name):
+    registrado = _cabecalhos.get(sheet_name)
+    if not registrado or time.time() - registrado[0] > CACHE_TTL:
+        _registrar_cabecalho(sheet_name, ws.row_values(1))
+        registrado = _cabecalhos[sheet_name]
+    return registrado[1]
+
+# --- ÍNDICE id → LINHA ---
+# { 'Financeiro': {'tempo': t, 'linhas': {id: nº da linha}, 'ultima': nº da última linha} }
+# Montado a partir da coluna A (uma leitura) e mantido nas inclusões e
+# exclusões feitas pelo app. Só olha a coluna A, então um UUID que apareça em
+# outra coluna (ex.: lista_ids_produtos das Malas) nunca é confundido com o id.
+_indices = {}
+_indices_lock = threading.Lock()
+
+def _registrar_indice(sheet_name, ids):
+    """`ids` são os valores da coluna A a partir da linha 2."""
+    linhas = {}
+    for i, id_valor in enumerate(ids):
+        # setdefault: em caso de id repetido vale a primeira linha (como o ws.find)
+        linhas.setdefault(str(id_valor), i + 2)
+    with _indices_lock:
+        _indices[sheet_name] = {"tempo": time.time(), "linhas": linhas, "ultima": len(ids) + 1}
+
+def _descartar_indice(sheet_name):
+    with _indices_lock:
+        _indices.pop(sheet_name, None)
+
+def _linhas_dos_ids(ws, sheet_name, ids):
+    """
+    Localiza vários ids de uma vez: ({id: nº da linha}, [ids não encontrados]).
+    Cada id é uma consulta ao dicionário; a coluna A só é relida se o índice
+    expirou ou se faltou algum id (pode ter sido incluído por outra instância).
+    """
+    with _indices_lock:
+        indice = _indices.get(sheet_name)
+    renovado = False
+    if not indice or time.time() - indice["tempo"] > CACHE_TTL:
+        _registrar_indice(sheet_name, ws.col_values(1)[1:])
+        renovado = True
+
+    def procurar():
+        with _indices_lock:
+            mapa = _indices[sheet_name]["linhas"]
+            achados = {i: mapa[str(i)] for i in ids if str(i) in mapa}
+        return achados, [i for i in ids if i not in achados]
+
+    achados, ausentes = procurar()
+    if ausentes and not renovado:
+        _registrar_indice(sheet_name, ws.col_values(1)[1:])
+        achados, ausentes = procurar()
+    return achados, ausentes
+
+def _linha_do_id(ws, sheet_name, id_valor):
+    """Número da linha do registro, ou None. Só consulta a API se o índice expirou."""
+    achados, _ = _linhas_dos_ids(ws, sheet_name, [id_valor])
+    return achados.get(id_valor)
+
+def _linhas_conferidas(ws, sheet_name, ids, cabecalho=False):
+    """
+    Como _linhas_dos_ids, para quem vai gravar nas linhas: confere numa
+    leitura só (batch_get) se a coluna A de cada linha ainda tem o id. Se uma
+    linha foi apagada ou movida fora do app, o índice é refeito e a busca
+    repetida uma vez; ids que continuam sem bater entram nos não encontrados.
+    `cabecalho=True`: a linha 1 vem na mesma leitura e renova o cabeçalho
+    registrado, para as colunas por nome irem para a posição atual.
+    """
+    for tentativa in range(2):
+        linhas, ausentes = _linhas_dos_ids(ws, sheet_name, list(ids))
+        ordem = list(linhas.items())
+        faixas = [f"A{l}" for _, l in ordem]
+        lidas = ws.batch_get((["1:1"] if cabecalho else []) + faixas) if ordem else []
+        if cabecalho and lidas:
+            topo = lidas.pop(0)
+            _registrar_cabecalho(sheet_name, topo[0] if topo else [])
+        certas = {i: l for (i, l), v in zip(ordem, lidas) if v and v[0] and str(v[0][0]) == str(i)}
+        if len(certas) == len(ordem):
+            return certas, ausentes
+        _descartar_indice(sheet_name)
+    return certas, ausentes + [i for i in linhas if i not in certas]
+
+def _conferir_append(sheet_name, linhas, resposta):
+    """Confere na resposta da API se todas as linhas foram gravadas."""
+    try:
+        gravadas = resposta["updates"]["updatedRows"]
+    except Exception:
+        return
+    if gravadas != len(linhas):
+        _descartar_indice(sheet_name)
+        raise RuntimeError(f"{sheet_name}: {gravadas} de {len(linhas)} linhas gravadas.")
+
+def _indice_apos_append(sheet_name, linhas, resposta):
+    _base_apos_escrita(sheet_name)
+    with _indices_lock:
+        indice = _indices.get(sheet_name)
+        if not indice:
+            return
+        # A resposta da API diz onde as linhas entraram (ex.: 'Produtos!A101:F130')
+        inicio = None
+        try:
+            faixa = resposta["updates"]["updatedRange"]
+            inicio = int(re.search(r"!\$?[A-Z]+\$?(\d+)", faixa).group(1))
+        except Exception:
+            pass
+        if inicio is None:
+            inicio = indice["ultima"] + 1
+        for i, linha in enumerate(linhas):
+            indice["linhas"].setdefault(str(linha[0]) if linha else "", inicio + i)
+        indice["ultima"] = max(indice["ultima"], inicio + len(linhas) - 1)
+
+def _indice_apos_delete(sheet_name, id_valor, linha):
+    with _indices_lock:
+        indice = _indices.get(sheet_name)
+        if not indice:
+            return
+        indice["linhas"].pop(str(id_valor), None)
+        indice["linhas"] = {k: (v - 1 if v > linha else v) for k, v in indice["linhas"].items()}
+        indice["ultima"] -= 1
+
+def _carregar(sheet_name):
+    """
+    Entrada do cache da aba ({'tempo', 'df', 'derivados'}), baixando se expirou.
+    None se não foi possível ler.
+    """
+    with _cache_lock:
+        entrada = _cache_abas.get(sheet_name)
+    if entrada and time.time() - entrada["tempo"] < CACHE_TTL:
+        return entrada
+
+    if USAR_ESPELHO:
+        try:
+            df = _ler_espelho(sheet_name)
+        except: return None
+    else:
+        conn = get_connection()
+        if not conn:
+            return None
+        try:
+            cab, linhas = _baixar(conn, sheet_name)
+            df = pd.DataFrame(linhas, columns=cab)
+        except: return None
+
+    # 'derivados' guarda estruturas calculadas a partir desta versão da aba
+    entrada = {"tempo": time.time(), "df": df, "derivados": {}}
+    with _cache_lock:
+        _cache_abas[sheet_name] = entrada
+    return entrada
+
+def _derivado(sheet_name, chave, construir):
+    """Calcula (uma vez por versão da aba) uma estrutura derivada do DataFrame bruto."""
+    entrada = _carregar(sheet_name)
+    if entrada is None:
+        return None
+    with _cache_lock:
+        pronto = entrada["derivados"].get(chave)
+    if pronto is None:
+        pronto = construir(entrada["df"])
+        with _cache_lock:
+            entrada["derivados"][chave] = pronto
+    return pronto
+
 def load_data(sheet_name):
-    conn = get_connection()
-    if conn:
+    entrada = _carregar(sheet_name)
+    if entrada is None:
+        return pd.DataFrame()
+    # Cópia: as telas criam colunas auxiliares no DataFrame recebido
+    return entrada["df"].copy()
+
+# --- LEITURA TIPADA ---
+# Colunas de cada aba que são convertidas uma vez na leitura:
+# moeda → float64, data → datetime64, categoria → category.
+ESQUEMAS = {
+    "Produtos": {
+        "moeda": ["preco_custo", "preco_venda"],
+        "categoria": ["tamanho", "status"],
+    },
+    "Financeiro": {
+        "moeda": ["valor"],
+        "data": ["data_lancamento", "data_vencimento"],
+        "categoria": ["tipo", "forma_pagamento", "status_pagamento"],
+    },
+    "Malas": {
+        "data": ["data_envio"],
+        "categoria": ["status"],
+    },
+    "Fechamentos": {
+        "categoria": ["status"],
+    },
+}
+
+def _tipar(sheet_name, df):
+    esquema = ESQUEMAS.get(sheet_name, {})
+    df = df.copy()
+    for col in esquema.get("moeda", []):
+        if col in df.columns:
+            df[col] = ut.converter_serie_para_float(df[col])
+    for col in esquema.get("data", []):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col].astype(str), errors="coerce", format="ISO8601")
+    for col in esquema.get("categoria", []):
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype("category")
+    return df
+
+def load_typed_data(sheet_name):
+    """
+    Como load_data, mas com as colunas já convertidas conforme ESQUEMAS
+    (valores em float, datas em datetime, status/tipo/tamanho como category).
+    A conversão é feita uma vez por versão da aba e fica no cache junto do bruto.
+    """
+    df = _derivado(sheet_name, "tipado", lambda bruto: _tipar(sheet_name, bruto))
+    if df is None:
+        return pd.DataFrame()
+    return df.copy()
+
+def _indexar(sheet_name, bruto):
+    # Aba sem cabeçalho: nada para indexar (a tela trata o DataFrame vazio)
+    if len(bruto.columns) == 0:
+        return pd.DataFrame()
+    # Tipa o bruto desta mesma versão (um _derivado aqui poderia recarregar a aba)
+    df = _tipar(sheet_name, bruto)
+    chave = df.columns[0]
+    df = df.set_index(df[chave].astype(str).rename(None))
+    # id repetido: vale o primeiro, como no índice id → linha
+    return df[~df.index.duplicated()]
+
+def load_indexed_data(sheet_name):
+    """
+    Versão tipada com o índice do DataFrame = coluna A (id), para buscar
+    vários registros de uma vez com .reindex/.loc em vez de filtrar a aba
+    inteira para cada id. A coluna id continua disponível.
+    """
+    df = _derivado(sheet_name, "indexado", lambda bruto: _indexar(sheet_name, bruto))
+    if df is None:
+        return pd.DataFrame()
+    return df.copy()
+
+# --- ESPELHO SQLITE ---
+
+def _ler_espelho(sheet_name):
+    esp = get_espelho()
+    if USAR_WRITE_BEHIND:
+        # Envia o que sobrou na fila de uma execução anterior
+        _acordar_fila()
+    if time.time() - esp.sincronizado_em(sheet_name) > SYNC_INTERVALO:
         try:
-            return pd.DataFrame(conn.worksheet(sheet_name).get_all_records())
-        except: return pd.DataFrame()
-    return pd.DataFrame()
+            sincronizar(sheet_name)
+        except Exception:
+            # Sem rede/cota: segue com a cópia local que já existe
+            if esp.cabecalho(sheet_name) is None:
+                raise
+    return esp.ler(sheet_name)
 
-def append_data(sheet_name, row_data):
+def _versao_planilha(conn):
+    """Horário da última alteração da planilha (Drive). None se não der para consultar."""
+    try:
+        if hasattr(conn, "get_lastUpdateTime"):
+            if INSTRUMENTAR:
+                # Uma requisição ao Drive em toda carga incremental e sincronização
+                return instrumentacao.medir("get_lastUpdateTime", "(planilha)", conn.get_lastUpdateTime)
+            return conn.get_lastUpdateTime()
+        return conn.lastUpdateTime
+    except Exception:
+        return None
+
+def sincronizar(*sheet_names, completa=False):
+    """
+    Envia para a planilha as escritas locais pendentes e depois traz as abas
+    que mudaram. Se a planilha não foi alterada desde a última carga (mesma
+    versão no Drive), nenhuma aba é baixada.
+    `completa=True` (botão "Sincronizar Agora") baixa todas as abas inteiras,
+    sem olhar a versão nem usar a carga incremental: traz também o que foi
+    editado na planilha fora das colunas vigiadas (ABAS_INCREMENTAIS).
+    """
     conn = get_connection()
-    if conn:
-        try:
-            conn.worksheet(sheet_name).append_row(row_data)
-            st.cache_data.clear()
-        except Exception as e: st.error(f"Erro salvar: {e}")
+    if not conn:
+        return False
+    esp = get_espelho()
+    if USAR_WRITE_BEHIND:
+        _acordar_fila()
+    else:
+        _enviar_pendencias()
 
-def append_data_batch(sheet_name, list_of_rows):
+    abas = sheet_names or local_store.ABAS_ESPELHADAS
+    versao = _versao_planilha(conn)
+    for aba in abas:
+        # Não sobrescreve o que ainda não chegou na planilha
+        if esp.tem_pendencias(aba):
+            continue
+        if versao and esp.versao(aba) == versao and not completa:
+            esp.marcar_sincronizado(aba)
+            continue
+        if completa:
+            _bases.pop(aba, None)
+        cab, linhas = _baixar(conn, aba)
+        esp.substituir(aba, cab, linhas, versao)
+    invalidar_cache(*abas)
+    return True
+
+_envio_lock = threading.Lock()
+
+def _coalescer(pendencias):
+    """
+    Junta pendências consecutivas da mesma aba num único envio:
+    inclusões viram um append_rows e atualizações viram um update_cells.
+    Uma 'transacao' vai sempre sozinha, e nada que vem depois dela numa das
+    suas abas é juntado ao que veio antes.
+    Retorna [(seqs, mutação)] preservando a ordem dentro de cada aba.
+    """
+    grupos = []
+    ultimo_da_aba = {}
+    for seq, m in pendencias:
+        aba, op = m["aba"], m["op"]
+        if op == "transacao":
+            grupo = ([seq], m)
+            grupos.append(grupo)
+            for a in local_store.abas_da_mutacao(m):
+                ultimo_da_aba[a] = grupo
+            continue
+        ultimo = ultimo_da_aba.get(aba)
+        if op == "append" and ultimo and ultimo[1]["op"] == "append":
+            ultimo[0].append(seq)
+            ultimo[1]["linhas"].extend(m["linhas"])
+            continue
+        if op in ("update", "update_lote"):
+            valores = {m["id"]: m["valores"]} if op == "update" else m["valores"]
+            # O update direto grava como USER_ENTERED (número continua número);
+            # só junta no mesmo update_cells o que tem o mesmo tratamento
+            entrada = "USER_ENTERED" if op == "update" else m.get("value_input_option", "RAW")
+            if (ultimo and ultimo[1]["op"] == "update_lote"
+                    and ultimo[1].get("value_input_option", "RAW") == entrada):
+                ultimo[0].append(seq)
+                for id_valor, v in valores.items():
+                    ultimo[1]["valores"].setdefault(id_valor, {}).update(v)
+                continue
+            m = {"op": "update_lote", "aba": aba, "valores": {k: dict(v) for k, v in valores.items()},
+                 "value_input_option": entrada}
+        else:
+            m = dict(m)
+            if op == "append":
+                m["linhas"] = list(m["linhas"])
+        grupo = ([seq], m)
+        grupos.append(grupo)
+        ultimo_da_aba[aba] = grupo
+    return grupos
+
+def _enviar_pendencias():
+    """Reaplica na planilha, em ordem, as mutações registradas no espelho."""
     conn = get_connection()
-    if conn:
+    if not conn:
+        return
+    esp = get_espelho()
+    with _envio_lock:
+        pendentes = esp.pendencias()
+        if not pendentes:
+            return
+        inicio = time.perf_counter()
+        for seqs, mutacao in _coalescer(pendentes):
+            # Se o registro não existe mais na planilha, a pendência é descartada
+            conflitos = {}
+            try:
+                if mutacao["op"] == "transacao":
+                    if not _enviar_transacao(conn, mutacao, conflitos):
+                        _transacao_recusada(esp, mutacao, conflitos)
+                else:
+                    _aplicar_na_planilha(conn, [mutacao], conflitos=conflitos)
+            except Exception as e:
+                if _eh_erro_transitorio(e):
+                    raise
+                # Recusa que não passa sozinha (ex.: coluna renomeada): depois de
+                # PENDENCIA_TENTATIVAS a pendência sai da fila e as seguintes andam
+                if not esp.registrar_falha(seqs, f"{type(e).__name__}: {e}", PENDENCIA_TENTATIVAS):
+                    raise
+                # A mudança local não vai chegar na planilha: a cópia local volta a ser a dela
+                _expirar_abas(esp, local_store.abas_da_mutacao(mutacao))
+                continue
+            esp.remover_pendencias(seqs)
+            if conflitos:
+                # Reserva feita no espelho, mas outra instância mexeu antes na
+                # planilha: vale a planilha, que volta na próxima sincronização
+                _fila_status["conflitos"] += len(conflitos)
+        _fila_status["ultimo_flush_ms"] = (time.perf_counter() - inicio) * 1000
+        _fila_status["ultimo_flush_em"] = time.time()
+        _fila_status["enviadas"] += len(pendentes)
+
+def _enviar_transacao(conn, m, conflitos):
+    """
+    Envia a pendência de uma Transacao feita no espelho como uma operação do
+    diário: tudo ou nada também na planilha. Se um envio anterior ficou no
+    meio (processo caiu), termina de desfazê-lo antes de tentar de novo.
+    True se gravou; False se a planilha recusou (reserva ou id que sumiu).
+    """
+    diario = get_diario()
+    # Não disputa a mesma operação com o recuperar_operacoes
+    with _recuperar_lock:
+        anterior = diario.operacao(m["id"])
+        if anterior and anterior["estado"] in ("aplicando", "desfazendo"):
+            if anterior["estado"] == "aplicando" and anterior["feitos"] == len(anterior["mutacoes"]):
+                diario.marcar(m["id"], "confirmada")
+            else:
+                _desfazer_operacao(conn, anterior["mutacoes"], anterior["desfazer"], anterior["feitos"])
+                diario.marcar(m["id"], "desfeita")
+            anterior = diario.operacao(m["id"])
+    if anterior and anterior["estado"] == "confirmada":
+        return True
+    ausentes = []
+    estado, erro = _aplicar_operacao(conn, m["id"], m["nome"], m["mutacoes"], m["desfazer"], ausentes, conflitos)
+    if erro:
+        raise erro
+    reservadas = {pid for p in m["mutacoes"] if p["op"] == "reservar" for pid in p["trocas"]}
+    conflitos.update({pid: "" for pid in ausentes if pid in reservadas})
+    return estado == "confirmada"
+
+# Transações do espelho que a planilha recusou no envio: id → {id da peça: status atual}
+_recusadas = {}
+
+def _expirar_abas(esp, abas):
+    """A próxima leitura das abas baixa a planilha e substitui a cópia local."""
+    for aba in abas:
+        esp.expirar(aba)
+    invalidar_cache(*abas)
+
+def _transacao_recusada(esp, m, conflitos):
+    """Nada da transação ficou na planilha: a cópia local das abas dela é baixada de novo."""
+    _expirar_abas(esp, local_store.abas_da_mutacao(m))
+    if not USAR_WRITE_BEHIND:
+        # Quem confirmou ainda está esperando o envio (Transacao.confirmar)
+        _recusadas[m["id"]] = dict(conflitos)
+    _fila_status["recusadas"].append({"nome": m["nome"], "em": time.time(), "pecas": len(conflitos)})
+    del _fila_status["recusadas"][:-20]
+
+def pendencias_sincronizacao():
+    """Quantidade de escritas locais que ainda não chegaram na planilha."""
+    if not USAR_ESPELHO:
+        return 0
+    return get_espelho().tem_pendencias()
+
+# --- FILA WRITE-BEHIND ---
+_fila_status = {"ultimo_flush_ms": None, "ultimo_flush_em": None, "ultimo_erro": None, "enviadas": 0, "conflitos": 0,
+               "recusadas": []}
+_fila_evento = threading.Event()
+_fila_thread = None
+_fila_lock = threading.Lock()
+
+def _eh_erro_de_cota(e):
+    resposta = getattr(e, "response", None)
+    return getattr(resposta, "status_code", None) == 429 or "429" in str(e)
+
+def _eh_erro_transitorio(e):
+    """Cota, rede ou erro do servidor (5xx): vale tentar de novo sem contar como falha."""
+    if _eh_erro_de_cota(e) or isinstance(e, (ConnectionError, TimeoutError, OSError)):
+        return True
+    codigo = getattr(getattr(e, "response", None), "status_code", None)
+    return isinstance(codigo, int) and codigo >= 500
+
+def _worker_fila():
+    espera = 1
+    while True:
+        if _fila_evento.wait(FLUSH_INTERVALO):
+            # Uma venda gera várias escritas seguidas: espera a rajada terminar
+            time.sleep(FLUSH_ATRASO)
+        _fila_evento.clear()
         try:
-            conn.worksheet(sheet_name).append_rows(list_of_rows)
-            st.cache_data.clear()
-            return True
-        except Exception as e: 
-            st.error(f"Erro salvar lote: {e}")
-            return False
+            _enviar_pendencias()
+            _fila_status["ultimo_erro"] = None
+            espera = 1
+        except Exception as e:
+            # Cota (429) ou rede: espera cada vez mais antes de tentar de novo
+            _fila_status["ultimo_erro"] = f"{'Cota excedida' if _eh_erro_de_cota(e) else 'Erro'}: {e}"
+            time.sleep(espera)
+            espera = min(espera * 2, 60)
 
-def update_data(sheet_name, id_value, updated_row_dict):
-    conn = get_connection()
-    if conn:
+def _acordar_fila():
+    """Garante que a thread de envio está rodando e pede um envio imediato."""
+    global _fila_thread
+    with _fila_lock:
+        if _fila_thread is None or not _fila_thread.is_alive():
+            _fila_thread = threading.Thread(target=_worker_fila, name="fl-write-behind", daemon=True)
+            _fila_thread.start()
+    _fila_evento.set()
+
+def status_fila():
+    """Profundidade da fila, latência do último envio e escritas recusadas (para exibir na tela)."""
+    mortas = get_espelho().pendencias_mortas() if USAR_ESPELHO else []
+    return dict(_fila_status, recusadas=list(_fila_status["recusadas"]),
+                pendentes=pendencias_sincronizacao(), mortas=mortas)
+
+def descartar_pendencias_mortas():
+    """Apaga as escritas que a planilha recusou PENDENCIA_TENTATIVAS vezes e traz as abas de novo."""
+    esp = get_espelho()
+    abas = {a for p in esp.pendencias_mortas() for a in local_store.abas_da_mutacao(p["mutacao"])}
+    esp.descartar_mortas()
+    if abas:
+        # Mesma versão no Drive não quer dizer mesma cópia local: baixa de novo
+        _expirar_abas(esp, abas)
+        sincronizar(*abas)
+
+# --- MUTAÇÕES ---
+# Toda escrita é descrita como um dicionário, o que permite guardá-la no
+# espelho local e reenviá-la depois:
+#   {"op": "append",      "aba": ..., "linhas": [[...], ...]}
+#   {"op": "update",      "aba": ..., "id": ..., "valores": {coluna: valor}}
+#   {"op": "update_lote", "aba": ..., "valores": {id: {coluna: valor}}}
+#   {"op": "upsert",      "aba": ..., "id": ..., "valores": {...}, "linha": [...] ou None}
+#   {"op": "delete",      "aba": ..., "id": ...}
+#   {"op": "replace",     "aba": ..., "cabecalho": [...], "linhas": [[...], ...]}
+#     (sobrescreve a partir de A1; linhas abaixo da faixa não são tocadas)
+#   {"op": "reservar",    "aba": ..., "coluna": ..., "trocas": {id: [esperado, novo]}}
+#     (troca a coluna só se todas as linhas ainda tiverem o valor esperado)
+#   {"op": "delete_lote", "aba": ..., "ids": [...]}
+#     (ids que não existem mais são ignorados; usado para desfazer inclusões)
+#   {"op": "transacao",   "aba": 1ª aba, "abas": [...], "id": ..., "nome": ...,
+#    "mutacoes": [...], "desfazer": [...]}
+#     (só no espelho: o lote de uma Transacao, enviado como uma operação do diário)
+# "coluna" é o número da coluna (A=1) ou o nome no cabeçalho.
+
+def _resolver_colunas(ws, sheet_name, valores):
+    """Troca nomes de coluna pela posição (A=1) usando o cabeçalho registrado da aba."""
+    cab = None
+    resolvido = {}
+    for chave, val in valores.items():
+        if isinstance(chave, int) or str(chave).isdigit():
+            resolvido[int(chave)] = val
+        else:
+            if cab is None:
+                cab = _cabecalho(ws, sheet_name)
+            if chave not in cab:
+                raise KeyError(f"Coluna '{chave}' não existe na aba {sheet_name}.")
+            resolvido[cab.index(chave) + 1] = val
+    return resolvido
+
+# Serializa a conferência + escrita das reservas entre as sessões do processo
+_reserva_lock = threading.Lock()
+
+def _reservar_na_planilha(ws, aba, m, ausentes=None, conflitos=None):
+    """
+    Compare-and-set da coluna: lê numa requisição (batch_get) o id e o valor
+    atual de cada linha e só grava se todas ainda estiverem com o esperado.
+    Com algum conflito nada é gravado; {id: valor atual} vai para `conflitos`.
+    A linha 1 vem na mesma leitura: se a coluna mudou de lugar, lê de novo.
+    """
+    trocas = m["trocas"]
+    col = next(iter(_resolver_colunas(ws, aba, {m["coluna"]: None})))
+    for tentativa in range(3):
+        linhas, nao_achados = _linhas_dos_ids(ws, aba, list(trocas))
+        ordem = list(linhas.items())
+        lidas = ws.batch_get(["1:1"] + [f"A{l}:{_letra(col)}{l}" for _, l in ordem]) if ordem else []
+        atuais, deslocadas = {}, []
+        if lidas:
+            topo = lidas.pop(0)
+            _registrar_cabecalho(aba, topo[0] if topo else [])
+            atual = next(iter(_resolver_colunas(ws, aba, {m["coluna"]: None})))
+            if atual != col:
+                # Lido na coluna errada: nada conferido nesta volta
+                col, deslocadas = atual, list(linhas)
+                continue
+        for (id_valor, linha), valores in zip(ordem, lidas):
+            celulas = valores[0] if valores else []
+            if not celulas or str(celulas[0]) != str(id_valor):
+                deslocadas.append(id_valor)
+            else:
+                atuais[id_valor] = str(celulas[col - 1]) if len(celulas) >= col else ""
+        if not deslocadas:
+            break
+        # Linhas mudaram de lugar (exclusão feita por outra instância): relê a coluna A
+        _descartar_indice(aba)
+    nao_achados = nao_achados + deslocadas
+    if ausentes is not None:
+        ausentes.extend(nao_achados)
+
+    diferentes = {i: v for i, v in atuais.items() if v != str(trocas[i][0])}
+    if diferentes or nao_achados:
+        if conflitos is not None:
+            conflitos.update(diferentes)
+        return False
+    cells = [Cell(linhas[i], col, trocas[i][1]) for i in atuais]
+    if cells:
+        ws.update_cells(cells)
+        _base_apos_update(aba, [m["coluna"]])
+    return True
+
+def _excluir_ids(ws, aba, ids):
+    """Exclui as linhas dos ids, de baixo para cima, um delete_rows por bloco de linhas vizinhas."""
+    # Apagar a linha errada não tem volta: só entram as linhas conferidas
+    linhas, _ = _linhas_conferidas(ws, aba, ids)
+    certas = sorted(linhas.values())
+    blocos = []
+    for l in certas:
+        if blocos and blocos[-1][1] == l - 1:
+            blocos[-1][1] = l
+        else:
+            blocos.append([l, l])
+    for inicio, fim in reversed(blocos):
+        ws.delete_rows(inicio, fim)
+    if blocos:
+        _descartar_indice(aba)
+        _bases.pop(aba, None)
+
+def _aplicar_na_planilha(conn, mutacoes, ausentes=None, conflitos=None):
+    """
+    Executa as mutações no Google Sheets. False se algum id não foi encontrado.
+    Os ids de um update_lote que não existem na aba vão para a lista `ausentes`;
+    os de uma reserva cujo valor mudou vão para o dicionário `conflitos`.
+    """
+    tudo_ok = True
+    for m in mutacoes:
+        aba = m["aba"]
+        ws = _worksheet(conn, aba)
+        op = m["op"]
+
+        if op == "append":
+            # Um único append_rows: a API grava todas as linhas ou nenhuma
+            resposta = ws.append_rows(m["linhas"])
+            _conferir_append(aba, m["linhas"], resposta)
+            _indice_apos_append(aba, m["linhas"], resposta)
+
+        elif op in ("update", "upsert"):
+            linha = _linhas_conferidas(ws, aba, [m["id"]], cabecalho=True)[0].get(m["id"])
+            if linha:
+                # Todas as colunas da linha numa requisição só.
+                # USER_ENTERED: mesmo tratamento que o update_cell dava aos valores.
+                cells = [Cell(linha, col_idx, val) for col_idx, val in _resolver_colunas(ws, aba, m["valores"]).items()]
+                if cells:
+                    ws.update_cells(cells, value_input_option="USER_ENTERED")
+                    _base_apos_update(aba, m["valores"])
+            elif op == "upsert" and m.get("linha"):
+                resposta = ws.append_rows([m["linha"]])
+                _indice_apos_append(aba, [m["linha"]], resposta)
+            elif op == "update":
+                tudo_ok = False
+
+        elif op == "update_lote":
+            # 1. Localiza todas as linhas pelo índice id → linha (O(n + k)),
+            #    conferindo a coluna A (e o cabeçalho) antes de gravar
+            linhas, nao_achados = _linhas_conferidas(ws, aba, list(m["valores"]), cabecalho=True)
+            if ausentes is not None:
+                ausentes.extend(nao_achados)
+            # 2. Monta o pacote de atualizações localmente
+            cells_to_update = []
+            for id_valor, row_idx in linhas.items():
+                for col_idx, val in _resolver_colunas(ws, aba, m["valores"][id_valor]).items():
+                    cells_to_update.append(Cell(row_idx, col_idx, val))
+            # 3. Requisição de Escrita (Envia tudo de uma vez)
+            if cells_to_update:
+                ws.update_cells(cells_to_update, value_input_option=m.get("value_input_option", "RAW"))
+                _base_apos_update(aba, {c for v in m["valores"].values() for c in v})
+
+        elif op == "reservar":
+            with _reserva_lock:
+                tudo_ok = _reservar_na_planilha(ws, aba, m, ausentes, conflitos) and tudo_ok
+
+        elif op == "delete":
+            linha = _linha_do_id(ws, aba, m["id"])
+            # Apagar a linha errada não tem volta: confere a célula A antes
+            if linha and ws.cell(linha, 1).value != str(m["id"]):
+                _descartar_indice(aba)
+                linha = _linha_do_id(ws, aba, m["id"])
+            if linha:
+                ws.delete_rows(linha)
+                _indice_apos_delete(aba, m["id"], linha)
+                _bases.pop(aba, None)
+            else:
+                tudo_ok = False
+
+        elif op == "delete_lote":
+            _excluir_ids(ws, aba, m["ids"])
+
+        elif op == "replace":
+            _descartar_indice(aba)
+            _bases.pop(aba, None)
+            _cabecalhos.pop(aba, None)
+            # Uma requisição só sobre a faixa fixa (cabeçalho + linhas): a aba
+            # nunca fica vazia ou pela metade se a conexão cair no meio
+            valores = [list(m["cabecalho"])] + [list(l) for l in m["linhas"]]
+            faixa = f"A1:{_letra(len(m['cabecalho']))}{len(valores)}"
+            ws.update(range_name=faixa, values=valores)
+
+        else:
+            raise ValueError(f"Operação desconhecida: {op}")
+    return tudo_ok
+
+def _executar(mutacoes, ausentes=None, invalidar=True, conflitos=None, tudo_ou_nada=False):
+    """
+    Ponto único de escrita. Sem espelho, vai direto para a planilha.
+    Com espelho, grava no SQLite (a tela já enxerga a mudança) e envia em seguida;
+    se o envio falhar, a escrita fica pendente para a próxima sincronização.
+    No modo write-behind o envio fica por conta da thread da fila.
+    `invalidar=False`: quem chama atualiza o cache das abas por conta própria.
+    `tudo_ou_nada` só vale no espelho (uma transação do SQLite); direto na
+    planilha, quem precisa disso usa a Transacao.
+    """
+    abas = {a for m in mutacoes for a in local_store.abas_da_mutacao(m)}
+    if USAR_ESPELHO:
+        esp = get_espelho()
+        for aba in abas:
+            if esp.cabecalho(aba) is None:
+                sincronizar(aba)
+        ok = esp.aplicar(mutacoes, ausentes=ausentes, conflitos=conflitos, tudo_ou_nada=tudo_ou_nada)
+        if invalidar:
+            invalidar_cache(*abas)
+        if USAR_WRITE_BEHIND:
+            _acordar_fila()
+            return ok
         try:
-            ws = conn.worksheet(sheet_name)
-            cell = ws.find(id_value)
-            if cell:
-                for col_idx, val in updated_row_dict.items(): ws.update_cell(cell.row, col_idx, val)
-                st.cache_data.clear()
-                return True
-        except: pass
+            _enviar_pendencias()
+        except Exception as e:
+            st.warning(f"Salvo localmente. Envio para a planilha pendente: {e}")
+        return ok
+
+    conn = get_connection()
+    if not conn:
+        return False
+    ok = _aplicar_na_planilha(conn, mutacoes, ausentes, conflitos)
+    if invalidar:
+        invalidar_cache(*abas)
+    return ok
+
+# --- ESCRITAS ---
+
+def append_data(sheet_name, row_data):
+    try:
+        _executar([{"op": "append", "aba": sheet_name, "linhas": [row_data]}])
+    except Exception as e: st.error(f"Erro salvar: {e}")
+
+def append_data_batch(sheet_name, list_of_rows):
+    """Inclui várias linhas com uma única requisição. True só se todas foram gravadas."""
+    if not list_of_rows:
+        return True
+    try:
+        return _executar([{"op": "append", "aba": sheet_name, "linhas": list_of_rows}])
+    except Exception as e: 
+        st.error(f"Erro salvar lote: {e}")
+        return False
+
+def update_data(sheet_name, id_value, updated_row_dict):
+    """`updated_row_dict` é {coluna: valor}, com o nome da coluna no cabeçalho (ou o número, A=1)."""
+    try:
+        return _executar([{"op": "update", "aba": sheet_name, "id": id_value, "valores": updated_row_dict}])
+    except: pass
     return False
 
 def delete_data(sheet_name, id_value):
-    conn = get_connection()
-    if conn:
-        try:
-            ws = conn.worksheet(sheet_name)
-            cell = ws.find(id_value)
-            if cell:
-                ws.delete_rows(cell.row)
-                st.cache_data.clear()
-                return True
-        except: pass
+    try:
+        return _executar([{"op": "delete", "aba": sheet_name, "id": id_value}])
+    except: pass
     return False
 
 def update_finance_status(fid, status):
-    conn = get_connection()
-    if conn:
-        try:
-            ws = conn.worksheet("Financeiro")
-            cell = ws.find(fid)
-            if cell:
-                ws.update_cell(cell.row, ws.row_values(1).index("status_pagamento")+1, status)
-                st.cache_data.clear()
-                return True
-        except: pass
+    try:
+        return _executar([{"op": "update", "aba": "Financeiro", "id": fid, "valores": {"status_pagamento": status}}])
+    except: pass
     return False
 
 # --- FUNÇÃO DE LOTE CORRIGIDA (SEM LOOP DE API) ---
 def update_product_status_batch(updates_dict):
     """
     Recebe um dicionário { 'ID_PRODUTO': 'NOVO_STATUS' }
-    Faz apenas DUAS requisições à API: uma de leitura e uma de escrita.
+    Faz uma única requisição de escrita; as linhas saem do índice id → linha
+    (no máximo uma leitura da coluna A). Ids que não existem na aba são
+    avisados na tela em vez de ignorados em silêncio.
     """
-    conn = get_connection()
-    if conn:
+    # A coluna 'status' é localizada pelo cabeçalho da aba
+    valores = {pid: {"status": new_status} for pid, new_status in updates_dict.items()}
+    if not valores:
+        return True # Se não tinha nada pra atualizar, retorna true
+    try:
+        ausentes = []
+        # Só muda o status: o cache do Produtos é ajustado em vez de baixado de novo
+        ok = _executar([{"op": "update_lote", "aba": "Produtos", "valores": valores}], ausentes, invalidar=False)
+        _atualizar_status_em_cache("Produtos", updates_dict)
+        if ausentes:
+            st.warning(f"{len(ausentes)} produto(s) não encontrado(s) na planilha: {', '.join(map(str, ausentes))}")
+        return ok
+    except Exception as e:
+        invalidar_cache("Produtos")
+        st.error(f"Erro no Batch Update: {e}")
+        return False
+
+def _atualizar_status_em_cache(sheet_name, novos):
+    """
+    Aplica {id: status} no DataFrame em cache da aba, sem baixá-la de novo.
+    Os derivados são descartados (recalculados na próxima leitura), menos os
+    que não olham o status e o índice de estoque, que é ajustado só nas
+    peças alteradas.
+    """
+    novos = {str(k): v for k, v in novos.items()}
+    with _cache_lock:
+        entrada = _cache_abas.get(sheet_name)
+        if not entrada or entrada["df"].empty or "status" not in entrada["df"].columns:
+            return
+        df = entrada["df"].copy()
+        ids = df[df.columns[0]].astype(str)
+        alterados = ids.isin(novos.keys())
+        df.loc[alterados, "status"] = ids[alterados].map(novos)
+        indice = entrada["derivados"].get("estoque")
+        # Índices que não dependem do status continuam valendo
+        mantidos = {k: v for k, v in entrada["derivados"].items() if k in _DERIVADOS_SEM_STATUS}
+        _cache_abas[sheet_name] = {
+            "tempo": entrada["tempo"],
+            "df": df,
+            "derivados": mantidos,
+        }
+    if indice is not None:
+        indice.aplicar(df[alterados].to_dict('records'))
+
+# --- TRANSAÇÕES (UNIDADE DE TRABALHO) ---
+# Uma venda grava Produtos e Financeiro; um retorno de mala grava Produtos,
+# Financeiro e Malas. A Transacao junta essas escritas, manda uma requisição
+# por aba e, se algo falhar no meio, desfaz o que já tinha ido.
+
+# Identifica este processo no diário (operações "aplicando" de outro processo
+# só são desfeitas depois de RECUPERAR_APOS)
+_PROCESSO = uuid.uuid4().hex
+_em_andamento = set()
+_recuperar_lock = threading.Lock()
+
+def _valores_atuais(aba, valores):
+    """{id: {coluna: valor de agora}} das colunas que vão ser alteradas (lido do cache)."""
+    df = load_data(aba)
+    if df.empty:
+        return {}
+    df = df.set_index(df[df.columns[0]].astype(str))
+    df = df[~df.index.duplicated()]
+    antes = {}
+    for id_valor, novos in valores.items():
+        if str(id_valor) in df.index:
+            linha = df.loc[str(id_valor)]
+            antes[id_valor] = {c: linha[c] for c in novos if c in df.columns}
+    return antes
+
+def _inversas(mutacoes):
+    """Mutações que desfazem cada passo, na mesma ordem."""
+    inversas = []
+    for m in mutacoes:
+        if m["op"] == "reservar":
+            inversas.append({"op": "update_lote", "aba": m["aba"],
+                             "valores": {pid: {m["coluna"]: esperado} for pid, (esperado, _) in m["trocas"].items()}})
+        elif m["op"] == "append":
+            inversas.append({"op": "delete_lote", "aba": m["aba"], "ids": [str(l[0]) for l in m["linhas"]]})
+        elif m["op"] == "update_lote":
+            inversas.append({"op": "update_lote", "aba": m["aba"], "valores": _valores_atuais(m["aba"], m["valores"])})
+        else:
+            raise ValueError(f"Operação sem desfazer na Transacao: {m['op']}")
+    return inversas
+
+def _passos_a_desfazer(mutacoes, feitos):
+    # O passo que falhou também pode ter gravado em parte, menos a reserva,
+    # que confere tudo antes de escrever
+    if feitos < len(mutacoes) and mutacoes[feitos]["op"] != "reservar":
+        return feitos + 1
+    return feitos
+
+def _desfazer_operacao(conn, mutacoes, desfazer, feitos):
+    for inversa in reversed(desfazer[:_passos_a_desfazer(mutacoes, feitos)]):
+        _aplicar_com_retentativa(conn, inversa)
+
+def _aplicar_com_retentativa(conn, mutacao, ausentes=None, conflitos=None, tentativas=3):
+    """Reenvia o passo se a planilha recusou por cota (429): nada foi gravado nesse caso."""
+    for tentativa in range(tentativas):
         try:
-            ws = conn.worksheet("Produtos")
-            
-            # 1. Requisição de Leitura (Pega todos os IDs da coluna 1)
-            # Isso é rápido e leve.
-            lista_ids = ws.col_values(1) 
-            
-            cells_to_update = []
-            
-            # 2. Monta o pacote de atualizações localmente
-            for pid, new_status in updates_dict.items():
-                if pid in lista_ids:
-                    # +1 porque lista começa em 0 e planilha em 1
-                    row_idx = lista_ids.index(pid) + 1 
-                    
-                    # Coluna 6 é o Status (A=1, B=2... F=6). 
-                    # CONFIRA SE NA SUA PLANILHA O STATUS É A COLUNA F.
-                    # Se for outra, mude o número 6 abaixo.
-                    cells_to_update.append(Cell(row_idx, 6, new_status))
-            
-            # 3. Requisição de Escrita (Envia tudo de uma vez)
-            if cells_to_update:
-                ws.update_cells(cells_to_update)
-                st.cache_data.clear()
-                return True
-            return True # Se não tinha nada pra atualizar, retorna true
-            
+            return _aplicar_na_planilha(conn, [mutacao], ausentes, conflitos)
         except Exception as e:
-            st.error(f"Erro no Batch Update: {e}")
-            return False
-    return False
+            if not _eh_erro_de_cota(e) or tentativa == tentativas - 1:
+                raise
+            time.sleep(2 ** tentativa)
 
-def get_meses_fechados():
-    conn = get_connection()
-    if conn:
+def _aplicar_operacao(conn, op_id, nome, mutacoes, desfazer, ausentes, conflitos):
+    """
+    Aplica o lote na planilha, passo a passo, registrado no diário. Se um passo
+    falhar ou for recusado, desfaz os anteriores. Retorna (estado, erro):
+    'confirmada'; 'desfeita' (erro é o que derrubou o passo, ou None se foi
+    recusa); ou 'desfazendo' se nem o desfazer passou agora (erro do desfazer;
+    fica no diário para o recuperar_operacoes).
+    """
+    diario = get_diario()
+    _em_andamento.add(op_id)
+    try:
+        diario.registrar(op_id, nome, _PROCESSO, mutacoes, desfazer)
+        feitos, erro = 0, None
         try:
-            ws = conn.worksheet("Fechamentos")
-            records = ws.get_all_records()
-            return [r['mes_ano'] for r in records if r['status'] == 'Fechado']
-        except:
-            return []
-    return []
+            for m in mutacoes:
+                faltavam = len(ausentes)
+                ok = _aplicar_com_retentativa(conn, m, ausentes, conflitos)
+                if not ok or len(ausentes) > faltavam:
+                    break
+                feitos += 1
+                diario.avancar(op_id, feitos)
+        except Exception as e:
+            erro = e
+        if feitos == len(mutacoes):
+            diario.marcar(op_id, "confirmada")
+            return "confirmada", None
+        diario.marcar(op_id, "desfazendo", str(erro) if erro else "recusada")
+        try:
+            _desfazer_operacao(conn, mutacoes, desfazer, feitos)
+        except Exception as e:
+            return "desfazendo", e
+        diario.marcar(op_id, "desfeita")
+        return "desfeita", erro
+    finally:
+        _em_andamento.discard(op_id)
 
-def alternar_fechamento_mes(mes_ano, acao):
-    conn = get_connection()
-    if conn:
+class Transacao:
+    """
+    Unidade de trabalho de uma operação de negócio:
+
+        t = db.Transacao("Venda Direta")
+        t.reservar({id: "Vendido", ...})
+        t.incluir("Financeiro", lancamentos)
+        if t.confirmar(): ...
+        else: t.conflitos  # {id: status atual} se a reserva foi recusada
+
+    Nada é gravado até o confirmar(). As escritas da mesma aba viram uma
+    requisição só (um append_rows e um update_cells por aba); as reservas vão
+    primeiro e, se recusadas, nada mais é enviado. Direto na planilha, a
+    operação e o que a desfaz ficam no diário local antes do envio: se um
+    passo falhar, os anteriores são desfeitos na hora ou, sem rede, depois
+    (recuperar_operacoes). Com o espelho, o lote vai numa transação do SQLite
+    e fica numa pendência só ('transacao'), enviada do mesmo jeito: pelo
+    diário, tudo ou nada. Se a planilha recusar a reserva no envio, nada da
+    operação é gravado lá e a cópia local das abas é baixada de novo.
+    """
+
+    def __init__(self, nome):
+        self.id = str(uuid.uuid4())
+        self.nome = nome
+        self.conflitos = {}
+        self._reservas = {}   # (aba, coluna) → {id: [esperado, novo]}
+        self._por_aba = {}    # aba → {"linhas": [...], "valores": {id: {coluna: valor}}}
+
+    def reservar(self, trocas, esperado=estoque.DISPONIVEL, aba="Produtos", coluna="status"):
+        reserva = self._reservas.setdefault((aba, coluna), {})
+        reserva.update({pid: [esperado, novo] for pid, novo in trocas.items()})
+        return self
+
+    def incluir(self, aba, linhas):
+        self._aba(aba)["linhas"].extend(list(l) for l in linhas)
+        return self
+
+    def atualizar(self, aba, id_valor, valores):
+        self._aba(aba)["valores"].setdefault(id_valor, {}).update(valores)
+        return self
+
+    def _aba(self, aba):
+        return self._por_aba.setdefault(aba, {"linhas": [], "valores": {}})
+
+    def mutacoes(self):
+        """Lote final: as reservas e depois, por aba, um append e um update_lote."""
+        lote = [{"op": "reservar", "aba": aba, "coluna": coluna, "trocas": trocas}
+                for (aba, coluna), trocas in self._reservas.items() if trocas]
+        for aba, escritas in self._por_aba.items():
+            if escritas["linhas"]:
+                lote.append({"op": "append", "aba": aba, "linhas": escritas["linhas"]})
+            if escritas["valores"]:
+                lote.append({"op": "update_lote", "aba": aba, "valores": escritas["valores"]})
+        return lote
+
+    def confirmar(self):
+        """Grava tudo ou nada. False se uma reserva foi recusada, um id não existe ou a planilha falhou."""
+        mutacoes = self.mutacoes()
+        if not mutacoes:
+            return True
+        ausentes, self.conflitos = [], {}
         try:
-            ws = conn.worksheet("Fechamentos")
-            cell = ws.find(mes_ano)
-            
-            if cell:
-                status = "Fechado" if acao == 'Fechar' else "Aberto"
-                ws.update_cell(cell.row, 2, status)
+            if USAR_ESPELHO:
+                ok = _executar([self._pendencia(mutacoes)], ausentes, conflitos=self.conflitos, tudo_ou_nada=True)
+                # Sem write-behind o envio já aconteceu: a recusa da planilha vale aqui
+                recusada = _recusadas.pop(self.id, None)
+                if recusada is not None:
+                    ok = False
+                    self.conflitos.update(recusada)
             else:
-                if acao == 'Fechar':
-                    ws.append_row([mes_ano, "Fechado"])
-            
-            st.cache_data.clear()
-            return True
+                ok = self._confirmar_na_planilha(mutacoes, ausentes)
         except Exception as e:
-            st.error(f"Erro ao atualizar fechamento: {e}")
+            st.error(f"Erro ao gravar {self.nome}: {e}")
+            ok = False
+        # Peça excluída por outra sessão também impede a reserva
+        reservadas = {pid for m in mutacoes if m["op"] == "reservar" for pid in m["trocas"]}
+        self.conflitos.update({pid: "" for pid in ausentes if pid in reservadas})
+        if not USAR_ESPELHO:
+            self._atualizar_cache(mutacoes, ok)
+        return ok
+
+    def _pendencia(self, mutacoes):
+        # O desfazer é montado agora: depois do aplicar, o espelho já tem os valores novos
+        abas = list(dict.fromkeys(m["aba"] for m in mutacoes))
+        return {"op": "transacao", "aba": abas[0], "abas": abas, "id": self.id, "nome": self.nome,
+                "mutacoes": mutacoes, "desfazer": _inversas(mutacoes)}
+
+    def _confirmar_na_planilha(self, mutacoes, ausentes):
+        conn = get_connection()
+        if not conn:
             return False
-    return False
+        estado, erro = _aplicar_operacao(conn, self.id, self.nome, mutacoes, _inversas(mutacoes),
+                                         ausentes, self.conflitos)
+        if estado == "desfazendo":
+            st.error(f"{self.nome}: falhou no meio e não deu para desfazer agora ({erro}). "
+                     "Será desfeita automaticamente quando a planilha responder.")
+            return False
+        if erro:
+            raise erro
+        return estado == "confirmada"
 
-def is_mes_fechado(data_verificacao):
+    def _atualizar_cache(self, mutacoes, ok):
+        for m in mutacoes:
+            if m["op"] == "reservar":
+                # Status só muda no cache se gravou; na recusa, entra o status atual das peças
+                novos = {pid: novo for pid, (_, novo) in m["trocas"].items()} if ok else self.conflitos
+                _atualizar_status_em_cache(m["aba"], novos)
+            elif ok and m["op"] == "update_lote" and all(set(v) == {"status"} for v in m["valores"].values()):
+                # Só status (ex.: retorno de mala): ajusta o cache em vez de baixar a aba
+                _atualizar_status_em_cache(m["aba"], {pid: v["status"] for pid, v in m["valores"].items()})
+            else:
+                invalidar_cache(m["aba"])
+
+def recuperar_operacoes():
+    """
+    Desfaz as operações do diário que ficaram no meio (processo caiu, ou a
+    planilha não respondeu na hora de desfazer). Retorna quantas foram desfeitas.
+    As que chegaram a aplicar todos os passos (o processo caiu antes de marcar)
+    são só marcadas como confirmadas.
+    """
+    if not _recuperar_lock.acquire(blocking=False):
+        return 0
     try:
-        str_data = str(data_verificacao)
-        mes_ano = str_data[:7] 
-        fechados = get_meses_fechados()
-        if mes_ano in fechados:
-            return True
+        diario = get_diario()
+        limite = time.time() - RECUPERAR_APOS
+        abertas = [op for op in diario.abertas()
+                   if op["id"] not in _em_andamento
+                   and (op["processo"] == _PROCESSO or op["criado_em"] < limite)]
+        if not abertas:
+            return 0
+        conn = get_connection()
+        if not conn:
+            return 0
+        desfeitas = 0
+        for op in abertas:
+            if op["estado"] == "aplicando" and op["feitos"] == len(op["mutacoes"]):
+                diario.marcar(op["id"], "confirmada")
+                continue
+            try:
+                _desfazer_operacao(conn, op["mutacoes"], op["desfazer"], op["feitos"])
+                diario.marcar(op["id"], "desfeita")
+                desfeitas += 1
+            except Exception as e:
+                diario.marcar(op["id"], "desfazendo", str(e))
+            invalidar_cache(*{m["aba"] for m in op["mutacoes"]})
+        return desfeitas
+    finally:
+        _recuperar_lock.release()
+
+def get_indice_estoque():
+    """Índice (nome, tamanho) → peças disponíveis do Produtos (ver estoque.IndiceEstoque)."""
+    indice = _derivado("Produtos", "estoque", estoque.IndiceEstoque.de_produtos)
+    return indice if indice is not None else estoque.IndiceEstoque()
+
+# --- BUSCA DOS SELETORES ---
+# Índices de busca (busca.IndiceBusca) montados uma vez por versão da aba.
+# Os seletores das telas só mandam ao navegador as opções que batem.
+
+def _entrada_peca(pid, nome, tamanho):
+    # O pedaço do id diferencia peças iguais (mesmo nome e tamanho) na tela,
+    # mas fica fora do texto buscável
+    return (str(pid), f"{nome} - {tamanho} · {str(pid)[:8]}", f"{nome} {tamanho}")
+
+def _busca(sheet_name, chave, entradas):
+    def construir(df):
+        return busca.IndiceBusca(entradas(df) if not df.empty else [])
+    indice = _derivado(sheet_name, chave, construir)
+    return indice if indice is not None else busca.IndiceBusca([])
+
+def get_busca_clientes():
+    """Clientes por nome; chave = id."""
+    return _busca("Clientes", "busca_clientes",
+                  lambda df: zip(df[df.columns[0]].astype(str), df['nome']))
+
+def get_busca_produtos(disponiveis=False):
+    """Peças por nome/tamanho; chave = id. Com `disponiveis`, só as com status Disponível."""
+    if disponiveis:
+        def entradas(df):
+            d = df[df['status'] == estoque.DISPONIVEL]
+            return [_entrada_peca(i, n, t) for i, n, t in zip(d[d.columns[0]], d['nome'], d['tamanho'])]
+        return _busca("Produtos", "busca_disponiveis", entradas)
+    return _busca("Produtos", "busca_produtos",
+                  lambda df: [_entrada_peca(i, n, t) for i, n, t in zip(df[df.columns[0]], df['nome'], df['tamanho'])])
+
+def get_busca_skus():
+    """Combinações (nome, tamanho) já cadastradas; chave = (nome, tamanho)."""
+    def entradas(df):
+        skus = df[['nome', 'tamanho']].drop_duplicates()
+        return [((n, t), f"{n} - {t}") for n, t in zip(skus['nome'], skus['tamanho'])]
+    return _busca("Produtos", "busca_skus", entradas)
+
+# Derivados do Produtos que continuam válidos quando só o status muda
+_DERIVADOS_SEM_STATUS = ("estoque", "busca_produtos", "busca_skus")
+
+# --- MESES FECHADOS ---
+# { 'tempo': momento da leitura, 'lista': [...] na ordem da aba, 'conjunto': frozenset }
+# O is_mes_fechado roda a cada rerun dos formulários de lançamento, então a
+# consulta é um `in` num conjunto em memória. Só o alternar_fechamento_mes
+# invalida; fechamentos feitos por outra sessão aparecem em até FECHAMENTO_TTL
+# (com o espelho, a aba é sincronizada com a planilha quando o prazo vence,
+# senão a releitura só veria o SQLite, atualizado a cada SYNC_INTERVALO).
+# A trava só protege a troca do retrato: a leitura da planilha é feita fora
+# dela, então as outras sessões seguem consultando o retrato anterior.
+_meses_fechados = {"tempo": 0.0, "lista": [], "conjunto": frozenset()}
+# Conta os alternar_fechamento_mes, para não guardar uma leitura anterior a um deles
+_meses_geracao = 0
+_meses_lock = threading.Lock()
+
+def _ler_fechamentos():
+    if USAR_ESPELHO:
+        try:
+            sincronizar("Fechamentos")
+        except Exception:
+            # Sem rede/cota: fica a cópia local
+            invalidar_cache("Fechamentos")
+    else:
+        # A aba é pequena: relê direto em vez de esperar o CACHE_TTL
+        invalidar_cache("Fechamentos")
+    records = load_data("Fechamentos").to_dict('records')
+    return [str(r['mes_ano']) for r in records if r['status'] == 'Fechado']
+
+def _fechamentos():
+    global _meses_fechados
+    with _meses_lock:
+        atual, geracao = _meses_fechados, _meses_geracao
+    if time.time() - atual["tempo"] <= FECHAMENTO_TTL:
+        return atual
+    lista = _ler_fechamentos()
+    novo = {"tempo": time.time(), "lista": lista, "conjunto": frozenset(lista)}
+    with _meses_lock:
+        # Um alternar_fechamento_mes durante a leitura: ela pode ser de antes
+        # da escrita, então não vira o retrato (a próxima consulta relê)
+        if geracao == _meses_geracao:
+            _meses_fechados = novo
+    return novo
+
+def _invalidar_fechamentos():
+    global _meses_fechados, _meses_geracao
+    with _meses_lock:
+        _meses_geracao += 1
+        _meses_fechados = dict(_meses_fechados, tempo=0.0)
+
+def get_meses_fechados():
+    try:
+        return list(_fechamentos()["lista"])
+    except:
+        return []
+
+def alternar_fechamento_mes(mes_ano, acao):
+    status = "Fechado" if acao == 'Fechar' else "Aberto"
+    linha_nova = [mes_ano, "Fechado"] if acao == 'Fechar' else None
+    try:
+        _executar([{"op": "upsert", "aba": "Fechamentos", "id": mes_ano, "valores": {"status": status}, "linha": linha_nova}])
+        return True
+    except Exception as e:
+        st.error(f"Erro ao atualizar fechamento: {e}")
         return False
+    finally:
+        _invalidar_fechamentos()
+
+def is_mes_fechado(data_verificacao):
+    try:
+        mes_ano = str(data_verificacao)[:7]
+        return mes_ano in _fechamentos()["conjunto"]
     except:
         return False
 
 # --- CONFIGURAÇÕES DO SISTEMA ---
 
-def get_configs():
-    conn = get_connection()
-    if conn:
+def _ler_configs(df):
+    config_dict = {}
+    for r in df.to_dict('records'):
         try:
-            ws = conn.worksheet("Configuracoes")
-            records = ws.get_all_records()
-            config_dict = {}
-            for r in records:
-                try:
-                    config_dict[r['parametro']] = float(str(r['valor']).replace(',', '.'))
-                except:
-                    config_dict[r['parametro']] = 0.0
-            return config_dict
+            config_dict[r['parametro']] = float(str(r['valor']).replace(',', '.'))
         except:
-            return {}
-    return {}
+            config_dict[r['parametro']] = 0.0
+    return config_dict
 
-def save_configs(novos_valores):
-    conn = get_connection()
-    if conn:
+def get_configs():
+    try:
+        # Convertido uma vez por versão da aba; o save_configs invalida
+        config_dict = _derivado("Configuracoes", "configs", _ler_configs)
+        return dict(config_dict) if config_dict else {}
+    except:
+        return {}
+
+@dataclass(frozen=True)
+class Parametros:
+    """Parâmetros de preço e taxas da aba Configuracoes (padrões usados se faltar algum)."""
+    custo_fixo: float = 1.06
+    markup: float = 2.0
+    taxa_extra: float = 1.12
+    taxa_cartao: float = 12.0  # em %
+
+def get_parametros():
+    """
+    Parâmetros tipados, lidos do mesmo cache de get_configs.
+    Chamar a cada tecla digitada não vai à planilha.
+    """
+    conf = get_configs()
+    padrao = Parametros()
+    return Parametros(**{campo: conf.get(campo, getattr(padrao, campo)) for campo in Parametros.__dataclass_fields__})
+
+# Limites aceitos para cada parâmetro: (mínimo, máximo)
+LIMITES_PARAMETROS = {
+    "custo_fixo": (0.0, 10000.0),
+    "markup": (0.01, 100.0),
+    "taxa_extra": (0.01, 100.0),
+    "taxa_cartao": (0.0, 100.0),
+}
+
+def _validar_configs(novos_valores):
+    """
+    Confere os valores antes de gravar e devolve as linhas [parametro, valor]
+    na ordem fixa de Parametros (o que não veio mantém o valor atual).
+    Levanta ValueError com a mensagem para a tela.
+    """
+    desconhecidos = set(novos_valores) - set(LIMITES_PARAMETROS)
+    if desconhecidos:
+        raise ValueError(f"Parâmetro(s) desconhecido(s): {', '.join(sorted(desconhecidos))}")
+    atuais = get_parametros()
+    rows = []
+    for k in Parametros.__dataclass_fields__:
+        v = novos_valores.get(k, getattr(atuais, k))
         try:
-            ws = conn.worksheet("Configuracoes")
-            ws.clear()
-            ws.append_row(["parametro", "valor"]) 
-            
-            rows = []
-            for k, v in novos_valores.items():
-                rows.append([k, v])
-            
-            ws.append_rows(rows)
-            st.cache_data.clear()
-            return True
-        except Exception as e:
-            st.error(f"Erro ao salvar configs: {e}")
-            return False
-    return False
+            v = float(str(v).replace(',', '.'))
+        except (TypeError, ValueError):
+            raise ValueError(f"Valor inválido para {k}: {v}")
+        minimo, maximo = LIMITES_PARAMETROS[k]
+        if not minimo <= v <= maximo:
+            raise ValueError(f"{k} deve estar entre {minimo:g} e {maximo:g}.")
+        rows.append([k, v])
+    return rows
+
+def save_configs(novos_valores):
+    try:
+        rows = _validar_configs(novos_valores)
+    except ValueError as e:
+        st.error(f"Configuração inválida: {e}")
+        return False
+    try:
+        _executar([{"op": "replace", "aba": "Configuracoes", "cabecalho": ["parametro", "valor"], "linhas": rows}])
+        return True
+    except Exception as e:
+        st.error(f"Erro ao salvar configs: {e}")
+        return False
 
 def confirmar_recebimento(id_registro, valor_final):
-    conn = get_connection()
-    if conn:
-        try:
-            ws = conn.worksheet("Financeiro")
-            cell = ws.find(id_registro)
-            
-            if cell:
-                # Atualiza Coluna 6 (Valor) e Coluna 8 (Status)
-                ws.update_cell(cell.row, 6, valor_final)
-                ws.update_cell(cell.row, 8, "Pago")
-                
-                st.cache_data.clear()
-                return True
-        except Exception as e:
-            st.error(f"Erro ao confirmar recebimento: {e}")
-            return False
-    return False
\ No newline at end of file
+    try:
+        valores = {"valor": valor_final, "status_pagamento": "Pago"}
+        return _executar([{"op": "update", "aba": "Financeiro", "id": id_registro, "valores": valores}])
+    except Exception as e:
+        st.error(f"Erro ao confirmar recebimento: {e}")
+        return False
@@ -0,0 +1,113 @@
+import threading
+from collections import deque
+from itertools import islice
+
+import utils as ut
+
+DISPONIVEL = "Disponível"
+
+
+class IndiceEstoque:
+    """
+    Peças disponíveis agrupadas por (nome, tamanho): cada SKU guarda a fila
+    dos ids na ordem da planilha, então a quantidade é len() da fila e a
+    alocação de uma venda pega as primeiras peças sem filtrar o Produtos.
+
+    Montado uma vez por versão da aba (db.get_indice_estoque) e ajustado no
+    lugar pelo update_product_status_batch.
+    """
+
+    def __init__(self):
+        # Compartilhado entre as sessões: leitura e ajuste sob o mesmo lock
+        self._lock = threading.RLock()
+        self._filas = {}    # (nome, tamanho) → deque de ids
+        self._sku_do_id = {}
+        self._preco = {}    # id → preço de venda (float)
+
+    @classmethod
+    def de_produtos(cls, df_p):
+        indice = cls()
+        if df_p.empty:
+            return indice
+        disp = df_p[df_p['status'] == DISPONIVEL]
+        precos = ut.converter_serie_para_float(disp['preco_venda'])
+        for pid, nome, tamanho, preco in zip(disp['id'], disp['nome'], disp['tamanho'], precos):
+            indice._incluir(str(pid), (nome, tamanho), preco)
+        return indice
+
+    def _incluir(self, pid, sku, preco):
+        if pid in self._sku_do_id:
+            return
+        self._filas.setdefault(sku, deque()).append(pid)
+        self._sku_do_id[pid] = sku
+        self._preco[pid] = preco
+
+    def _retirar(self, pid):
+        sku = self._sku_do_id.pop(pid, None)
+        if sku is None:
+            return
+        fila = self._filas[sku]
+        fila.remove(pid)
+        if not fila:
+            del self._filas[sku]
+        self._preco.pop(pid, None)
+
+    # --- CONSULTA ---
+
+    def __len__(self):
+        """Quantos SKUs têm estoque."""
+        with self._lock:
+            return len(self._filas)
+
+    def skus(self):
+        """SKUs com estoque, em ordem alfabética do rótulo (como o antigo groupby)."""
+        with self._lock:
+            return sorted(self._filas, key=self.rotulo)
+
+    @staticmethod
+    def rotulo(sku):
+        nome, tamanho = sku
+        return f"{nome} | Tam: {tamanho}"
+
+    def quantidade(self, sku):
+        with self._lock:
+            return len(self._filas.get(sku, ()))
+
+    def preco(self, sku):
+        """Preço de venda da primeira peça disponível do SKU."""
+        with self._lock:
+            fila = self._filas.get(sku)
+            return self._preco[fila[0]] if fila else 0.0
+
+    def alocar(self, itens):
+        """
+        Separa as peças de uma venda. `itens` é [(sku, qtd)]; o mesmo SKU pode
+        aparecer mais de uma vez (pega as peças seguintes da fila).
+        Retorna ({id: 'Vendido'}, None) ou ({}, sku sem estoque suficiente).
+        """
+        usados = {}
+        baixa = {}
+        with self._lock:
+            for sku, qtd in itens:
+                inicio = usados.get(sku, 0)
+                ids = list(islice(self._filas.get(sku, ()), inicio, inicio + qtd))
+                if len(ids) < qtd:
+                    return {}, sku
+                usados[sku] = inicio + qtd
+                baixa.update((pid, "Vendido") for pid in ids)
+        return baixa, None
+
+    # --- ATUALIZAÇÃO ---
+
+    def aplicar(self, linhas):
+        """
+        Ajusta o índice com registros alterados ({'id', 'nome', 'tamanho',
+        'preco_venda', 'status'}): entra quem ficou disponível, sai o resto.
+        """
+        with self._lock:
+            for r in linhas:
+                pid = str(r['id'])
+                if r['status'] == DISPONIVEL:
+                    self._incluir(pid, (r['nome'], r['tamanho']), ut.converter_input_para_float(r['preco_venda']))
+                else:
+                    self._retirar(pid)
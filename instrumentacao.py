@@ -0,0 +1,128 @@
+import sys
+import threading
+import time
+from collections import deque
+
+# Cota de leitura da API do Sheets por usuário (requisições por minuto)
+COTA_POR_MINUTO = 60
+
+# Últimas chamadas registradas (todas as sessões e a thread de envio)
+_registros = deque(maxlen=5000)
+_lock = threading.Lock()
+
+
+def _tamanho(resultado):
+    """Tamanho aproximado (bytes) do que a API devolveu."""
+    if resultado is None:
+        return 0
+    if isinstance(resultado, str):
+        return len(resultado.encode())
+    if isinstance(resultado, dict):
+        return len(str(resultado))
+    if isinstance(resultado, (list, tuple)):
+        total = 0
+        for item in resultado:
+            if isinstance(item, (list, tuple)):
+                total += sum(len(str(c)) for c in item)
+            else:
+                total += _tamanho(item)
+        return total
+    valor = getattr(resultado, "value", None)
+    return len(str(valor)) if valor is not None else 0
+
+
+def _tela_que_chamou():
+    """Primeira função de views/ na pilha (ex.: 'vendas.show_venda_direta'), ou a thread."""
+    f = sys._getframe(2)
+    while f is not None:
+        modulo = f.f_globals.get("__name__", "")
+        if modulo.startswith("views."):
+            return f"{modulo[6:]}.{f.f_code.co_name}"
+        f = f.f_back
+    return threading.current_thread().name
+
+
+class AbaInstrumentada:
+    """
+    Envolve uma gspread.Worksheet e registra cada chamada de método:
+    operação, aba, latência, bytes devolvidos e a tela que originou a chamada.
+    Só é usada quando a instrumentação está ligada (FL_INSTRUMENTAR).
+    """
+
+    def __init__(self, ws):
+        self._ws = ws
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._ws, nome)
+        if not callable(atributo):
+            return atributo
+
+        def chamada(*args, **kwargs):
+            return medir(nome, getattr(self._ws, "title", "?"), atributo, *args, **kwargs)
+        return chamada
+
+
+def medir(operacao, aba, funcao, *args, **kwargs):
+    """
+    Executa uma chamada à API e registra operação, latência e bytes. Usada pela
+    AbaInstrumentada e pelo database.py nas chamadas que não são da aba
+    (conn.worksheet, versão da planilha no Drive).
+    """
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        resultado = funcao(*args, **kwargs)
+        return resultado
+    except Exception as e:
+        erro, resultado = type(e).__name__, None
+        raise
+    finally:
+        registrar(operacao, aba, (time.perf_counter() - inicio) * 1000,
+                  _tamanho(resultado), _tela_que_chamou(), erro)
+
+
+def registrar(operacao, aba, ms, bytes_, tela, erro=None):
+    with _lock:
+        _registros.append({
+            "em": time.time(),
+            "thread": threading.get_ident(),
+            "operacao": operacao,
+            "aba": aba,
+            "ms": round(ms, 1),
+            "bytes": bytes_,
+            "tela": tela,
+            "erro": erro,
+        })
+
+
+def inicio_rodada():
+    """Marca o começo de um rerun; devolvido para filtrar as chamadas dele depois."""
+    return (threading.get_ident(), time.time())
+
+
+def chamadas_da_rodada(marca):
+    """Chamadas feitas pela thread do rerun desde a marca."""
+    thread, desde = marca
+    with _lock:
+        return [r for r in _registros if r["thread"] == thread and r["em"] >= desde]
+
+
+def requisicoes_por_minuto(minutos=5):
+    """[(minuto 'HH:MM', requisições)] dos últimos minutos, do mais antigo ao atual."""
+    agora = time.time()
+    inicio = agora - 60 * minutos
+    with _lock:
+        tempos = [r["em"] for r in _registros if r["em"] >= inicio]
+    contagem = {}
+    for t in tempos:
+        minuto = time.strftime("%H:%M", time.localtime(t))
+        contagem[minuto] = contagem.get(minuto, 0) + 1
+    minutos_lista = [time.strftime("%H:%M", time.localtime(agora - 60 * i)) for i in range(minutos - 1, -1, -1)]
+    return [(m, contagem.get(m, 0)) for m in minutos_lista]
+
+
+def ultimo_minuto():
+    """Requisições nos últimos 60 segundos (janela móvel, como a cota do Google)."""
+    limite = time.time() - 60
+    with _lock:
+        return sum(1 for r in _registros if r["em"] >= limite)
@@ -0,0 +1,68 @@
+import utils as ut
+from datetime import datetime
+
+# Formas de pagamento que pagam taxa de maquininha
+TERMOS_CARTAO = ["cartão", "credito", "debito", "crédito", "débito"]
+
+
+def preparar_financeiro(df_fin):
+    """Acrescenta a coluna numérica 'valor_float' (uma vez, reaproveitada pelos cálculos)."""
+    if 'valor_float' not in df_fin.columns:
+        df_fin = df_fin.assign(valor_float=ut.converter_serie_para_float(df_fin['valor']))
+    return df_fin
+
+
+def preparar_produtos(df_prod):
+    """Acrescenta 'preco_custo_float' e 'preco_venda_float'."""
+    novas = {}
+    for col in ('preco_custo', 'preco_venda'):
+        if f"{col}_float" not in df_prod.columns and col in df_prod.columns:
+            novas[f"{col}_float"] = ut.converter_serie_para_float(df_prod[col])
+    return df_prod.assign(**novas) if novas else df_prod
+
+
+def calcular_kpis(df_fin, df_prod, mes_atual=None, taxa_cartao=0.12):
+    """
+    Indicadores do Dashboard calculados com operações de coluna do pandas
+    (mesmas regras do antigo loop com iterrows):
+    - Caixa: lançamentos pagos; Venda/Entrada somam, Despesa subtrai.
+    - Taxas: `taxa_cartao` sobre as entradas pagas no cartão/débito/crédito.
+    - A Receber: vendas pendentes.
+    - Estoque: custo das peças disponíveis.
+    - Ticket médio: vendas lançadas no mês atual.
+    """
+    if mes_atual is None:
+        mes_atual = datetime.now().strftime("%Y-%m")
+
+    fin = preparar_financeiro(df_fin)
+    val = fin['valor_float']
+    tipo = fin['tipo']
+    pago = fin['status_pagamento'] == 'Pago'
+
+    eh_venda = tipo == 'Venda'
+    do_mes = fin['data_lancamento'].astype(str).str.startswith(mes_atual, na=False)
+    vendas_mes = eh_venda & do_mes
+    pendentes = eh_venda & (fin['status_pagamento'] == 'Pendente')
+    entradas = pago & tipo.isin(['Venda', 'Entrada'])
+    despesas = pago & (tipo == 'Despesa')
+    no_cartao = (fin['forma_pagamento'].astype(str).str.lower()
+                 .str.contains("|".join(TERMOS_CARTAO), regex=True, na=False))
+
+    caixa_bruto = val[entradas].sum() - val[despesas].sum()
+    taxas = (val[entradas & no_cartao] * taxa_cartao).sum()
+    vendas_no_mes = int(vendas_mes.sum())
+    valor_vendas_mes = val[vendas_mes].sum()
+
+    prods_disp = preparar_produtos(df_prod[df_prod['status'] == 'Disponível'])
+
+    return {
+        'caixa_bruto': float(caixa_bruto),
+        'caixa_liquido': float(caixa_bruto - taxas),
+        'taxas_cartao': float(taxas),
+        'a_receber': float(val[pendentes].sum()),
+        'estoque_custo': float(prods_disp['preco_custo_float'].sum()),
+        'qtd_produtos': len(prods_disp),
+        'vendas_no_mes': vendas_no_mes,
+        'valor_vendas_mes': float(valor_vendas_mes),
+        'ticket_medio': float(valor_vendas_mes / vendas_no_mes) if vendas_no_mes > 0 else 0,
+    }
@@ -0,0 +1,422 @@
+import sqlite3
+import json
+import hashlib
+import threading
+import time
+import pandas as pd
+
+# Abas da planilha "FL Boutique Sistema" que ficam copiadas no SQLite
+ABAS_ESPELHADAS = ("Produtos", "Clientes", "Malas", "Financeiro", "Fechamentos", "Configuracoes")
+
+# Colunas que recebem índice quando existem na aba (filtros mais usados nas telas)
+COLUNAS_INDEXADAS = ("id", "status", "data_lancamento", "tipo")
+
+
+def _q(nome):
+    """Coloca aspas em nomes de tabela/coluna vindos do cabeçalho da planilha."""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def _tabela(aba):
+    return _q(f"aba_{aba}")
+
+
+def abas_da_mutacao(m):
+    """Abas tocadas pela mutação (uma 'transacao' leva as de todas as partes)."""
+    return m.get("abas") or [m["aba"]]
+
+
+class EspelhoLocal:
+    """
+    Cópia local (SQLite) das abas da planilha.
+
+    Cada aba vira uma tabela com as mesmas colunas do cabeçalho, mais a coluna
+    interna `_linha` (posição da linha na planilha). As colunas não têm tipo
+    declarado, então números e textos ficam exatamente como vieram do gspread.
+
+    As escritas feitas pelo app são aplicadas aqui na hora e registradas em
+    `_pendencias`, de onde a sincronização as envia para a planilha.
+    """
+
+    def __init__(self, caminho):
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS _abas ("
+            " aba TEXT PRIMARY KEY, cabecalho TEXT, sincronizado_em REAL, versao TEXT, assinatura TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS _pendencias ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, aba TEXT, criado_em REAL, mutacao TEXT)"
+        )
+        # Bancos criados antes do controle de falhas: acrescenta as colunas
+        colunas = {c[1] for c in self._conn.execute("PRAGMA table_info(_pendencias)")}
+        if "tentativas" not in colunas:
+            self._conn.execute("ALTER TABLE _pendencias ADD COLUMN tentativas INTEGER DEFAULT 0")
+            self._conn.execute("ALTER TABLE _pendencias ADD COLUMN erro TEXT")
+            self._conn.execute("ALTER TABLE _pendencias ADD COLUMN morta INTEGER DEFAULT 0")
+
+    # --- METADADOS ---
+
+    def _meta(self, aba):
+        cur = self._conn.execute(
+            "SELECT cabecalho, sincronizado_em, versao, assinatura FROM _abas WHERE aba = ?", (aba,)
+        )
+        return cur.fetchone()
+
+    def cabecalho(self, aba):
+        with self._lock:
+            meta = self._meta(aba)
+        return json.loads(meta[0]) if meta else None
+
+    def sincronizado_em(self, aba):
+        with self._lock:
+            meta = self._meta(aba)
+        return meta[1] if meta else 0.0
+
+    def versao(self, aba):
+        with self._lock:
+            meta = self._meta(aba)
+        return meta[2] if meta else None
+
+    def expirar(self, aba):
+        """
+        Força a próxima sincronização a baixar a aba e substituir a cópia local,
+        mesmo que a planilha não tenha mudado (ex.: escrita local recusada no envio).
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE _abas SET sincronizado_em = 0, versao = NULL, assinatura = NULL WHERE aba = ?", (aba,)
+            )
+
+    def marcar_sincronizado(self, aba, versao=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE _abas SET sincronizado_em = ?, versao = COALESCE(?, versao) WHERE aba = ?",
+                (time.time(), versao, aba),
+            )
+
+    # --- LEITURA ---
+
+    def ler(self, aba):
+        """Devolve a aba como DataFrame, na ordem da planilha."""
+        with self._lock:
+            cab = self.cabecalho(aba)
+            if not cab:
+                return pd.DataFrame()
+            colunas = ", ".join(_q(c) for c in cab)
+            cur = self._conn.execute(f"SELECT {colunas} FROM {_tabela(aba)} ORDER BY _linha")
+            linhas = cur.fetchall()
+        return pd.DataFrame(linhas, columns=cab)
+
+    # --- CARGA VINDA DA PLANILHA ---
+
+    def substituir(self, aba, cabecalho, linhas, versao=None):
+        """
+        Grava o conteúdo baixado da planilha (cabeçalho + linhas).
+        Se nada mudou desde a última carga (mesma assinatura), só atualiza o horário.
+        """
+        assinatura = hashlib.sha1(json.dumps([cabecalho, linhas], default=str).encode()).hexdigest()
+        with self._lock:
+            meta = self._meta(aba)
+            if meta and meta[3] == assinatura and json.loads(meta[0]) == list(cabecalho):
+                self.marcar_sincronizado(aba, versao)
+                return False
+
+            tabela = _tabela(aba)
+            self._conn.execute("BEGIN")
+            try:
+                if not meta or json.loads(meta[0]) != list(cabecalho):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {tabela}")
+                    colunas = ", ".join(["_linha INTEGER"] + [_q(c) for c in cabecalho])
+                    self._conn.execute(f"CREATE TABLE {tabela} ({colunas})")
+                    self._conn.execute(f"CREATE INDEX {_q(f'ix_{aba}__linha')} ON {tabela} (_linha)")
+                    for col in COLUNAS_INDEXADAS:
+                        if col in cabecalho:
+                            self._conn.execute(f"CREATE INDEX {_q(f'ix_{aba}_{col}')} ON {tabela} ({_q(col)})")
+                else:
+                    self._conn.execute(f"DELETE FROM {tabela}")
+
+                marcadores = ", ".join(["?"] * (len(cabecalho) + 1))
+                self._conn.executemany(
+                    f"INSERT INTO {tabela} VALUES ({marcadores})",
+                    [[i + 2] + list(l) for i, l in enumerate(linhas)],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO _abas (aba, cabecalho, sincronizado_em, versao, assinatura)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (aba, json.dumps(list(cabecalho)), time.time(), versao, assinatura),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    # --- ESCRITAS LOCAIS ---
+
+    def aplicar(self, mutacoes, registrar=True, ausentes=None, conflitos=None, tudo_ou_nada=False):
+        """
+        Aplica as mutações nas tabelas locais. As que encontraram o registro
+        (ou são inclusões) vão para a fila de pendências, se `registrar`.
+        Retorna False se alguma atualização/exclusão não achou o id; os ids de
+        um update_lote que não existem vão para a lista `ausentes` e os de uma
+        reserva recusada, com o valor atual, para o dicionário `conflitos`.
+        Com `tudo_ou_nada`, qualquer uma dessas falhas desfaz o lote inteiro.
+        """
+        tudo_ok = True
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for m in mutacoes:
+                    antes = len(ausentes) if ausentes is not None else 0
+                    ok = self._aplicar_uma(m, ausentes, conflitos)
+                    if tudo_ou_nada and ausentes is not None and len(ausentes) > antes:
+                        ok = False
+                    tudo_ok = tudo_ok and ok
+                    if not tudo_ok and tudo_ou_nada:
+                        break
+                    if ok and registrar:
+                        # Uma 'transacao' fica numa pendência só, marcada em todas as suas abas
+                        self._conn.execute(
+                            "INSERT INTO _pendencias (aba, criado_em, mutacao) VALUES (?, ?, ?)",
+                            (",".join(abas_da_mutacao(m)), time.time(), json.dumps(m, default=str)),
+                        )
+                if not tudo_ok and tudo_ou_nada:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return tudo_ok
+
+    def _aplicar_uma(self, m, ausentes=None, conflitos=None):
+        aba = m["aba"]
+        cab = self.cabecalho(aba)
+        if cab is None:
+            raise RuntimeError(f"Aba '{aba}' ainda não foi sincronizada.")
+        tabela = _tabela(aba)
+        op = m["op"]
+
+        if op == "append":
+            for linha in m["linhas"]:
+                self._inserir(tabela, cab, linha)
+            return True
+        if op == "update":
+            return self._atualizar(tabela, cab, m["id"], m["valores"])
+        if op == "update_lote":
+            for id_valor, valores in m["valores"].items():
+                if not self._atualizar(tabela, cab, id_valor, valores) and ausentes is not None:
+                    ausentes.append(id_valor)
+            return True
+        if op == "upsert":
+            if self._atualizar(tabela, cab, m["id"], m["valores"]):
+                return True
+            if m.get("linha"):
+                self._inserir(tabela, cab, m["linha"])
+            return True
+        if op == "reservar":
+            return self._reservar(tabela, cab, m, ausentes, conflitos)
+        if op == "transacao":
+            # Lote de uma Transacao: as partes só valem juntas (aplicar com tudo_ou_nada)
+            for parte in m["mutacoes"]:
+                antes = len(ausentes) if ausentes is not None else 0
+                if not self._aplicar_uma(parte, ausentes, conflitos):
+                    return False
+                if ausentes is not None and len(ausentes) > antes:
+                    return False
+            return True
+        if op == "delete":
+            return self._excluir(tabela, cab, m["id"])
+        if op == "delete_lote":
+            for id_valor in m["ids"]:
+                self._excluir(tabela, cab, id_valor)
+            return True
+        if op == "replace":
+            # Mesmo efeito da planilha: sobrescreve as primeiras linhas e mantém o resto
+            self._conn.execute(f"DELETE FROM {tabela} WHERE _linha <= ?", (len(m["linhas"]) + 1,))
+            marcadores = ", ".join(["?"] * (len(cab) + 1))
+            for i, linha in enumerate(m["linhas"]):
+                valores = (list(linha) + [""] * len(cab))[:len(cab)]
+                self._conn.execute(f"INSERT INTO {tabela} VALUES ({marcadores})", [i + 2] + valores)
+            return True
+        raise ValueError(f"Operação desconhecida: {op}")
+
+    def _excluir(self, tabela, cab, id_valor):
+        cur = self._conn.execute(f"SELECT _linha FROM {tabela} WHERE {_q(cab[0])} = ?", (id_valor,))
+        achou = cur.fetchone()
+        if not achou:
+            return False
+        self._conn.execute(f"DELETE FROM {tabela} WHERE _linha = ?", (achou[0],))
+        self._conn.execute(f"UPDATE {tabela} SET _linha = _linha - 1 WHERE _linha > ?", (achou[0],))
+        return True
+
+    def _inserir(self, tabela, cab, linha):
+        valores = (list(linha) + [""] * len(cab))[:len(cab)]
+        proxima = self._conn.execute(f"SELECT COALESCE(MAX(_linha), 1) + 1 FROM {tabela}").fetchone()[0]
+        marcadores = ", ".join(["?"] * (len(cab) + 1))
+        self._conn.execute(f"INSERT INTO {tabela} VALUES ({marcadores})", [proxima] + valores)
+
+    def _atualizar(self, tabela, cab, id_valor, valores):
+        sets, params = [], []
+        for chave, val in valores.items():
+            sets.append(f"{_q(_nome_coluna(cab, chave))} = ?")
+            params.append(val)
+        if not sets:
+            return True
+        cur = self._conn.execute(
+            f"UPDATE {tabela} SET {', '.join(sets)} WHERE {_q(cab[0])} = ?", params + [id_valor]
+        )
+        return cur.rowcount > 0
+
+    def _reservar(self, tabela, cab, m, ausentes=None, conflitos=None):
+        """Tudo ou nada: só troca a coluna se todas as linhas estão com o valor esperado."""
+        coluna = _q(_nome_coluna(cab, m["coluna"]))
+        ids = list(m["trocas"])
+        atuais = {}
+        for i in range(0, len(ids), 500):
+            parte = ids[i:i + 500]
+            cur = self._conn.execute(
+                f"SELECT {_q(cab[0])}, {coluna} FROM {tabela} WHERE {_q(cab[0])} IN ({', '.join('?' * len(parte))})",
+                parte,
+            )
+            for id_valor, valor in cur.fetchall():
+                atuais.setdefault(str(id_valor), "" if valor is None else str(valor))
+        faltam = [i for i in ids if str(i) not in atuais]
+        diferentes = {i: atuais[str(i)] for i in ids if str(i) in atuais and atuais[str(i)] != str(m["trocas"][i][0])}
+        if faltam or diferentes:
+            if ausentes is not None:
+                ausentes.extend(faltam)
+            if conflitos is not None:
+                conflitos.update(diferentes)
+            return False
+        self._conn.executemany(
+            f"UPDATE {tabela} SET {coluna} = ? WHERE {_q(cab[0])} = ?",
+            [(novo, id_valor) for id_valor, (_, novo) in m["trocas"].items()],
+        )
+        return True
+
+    # --- FILA DE PENDÊNCIAS ---
+
+    def pendencias(self):
+        """Lista [(seq, mutação)] na ordem em que foram feitas (sem as que desistimos de enviar)."""
+        with self._lock:
+            cur = self._conn.execute("SELECT seq, mutacao FROM _pendencias WHERE morta = 0 ORDER BY seq")
+            return [(seq, json.loads(txt)) for seq, txt in cur.fetchall()]
+
+    def remover_pendencias(self, seqs):
+        with self._lock:
+            self._conn.executemany("DELETE FROM _pendencias WHERE seq = ?", [(s,) for s in seqs])
+
+    def registrar_falha(self, seqs, erro, limite):
+        """
+        Conta uma recusa da planilha para as pendências. Com `limite`
+        tentativas, elas saem da fila (ficam como 'mortas', para conferência)
+        e deixam de travar as escritas seguintes. Retorna True se saíram.
+        """
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE _pendencias SET tentativas = tentativas + 1, erro = ?,"
+                " morta = CASE WHEN tentativas + 1 >= ? THEN 1 ELSE 0 END WHERE seq = ?",
+                [(erro, limite, s) for s in seqs],
+            )
+            cur = self._conn.execute("SELECT MIN(morta) FROM _pendencias WHERE seq = ?", (seqs[0],))
+            return bool(cur.fetchone()[0])
+
+    def pendencias_mortas(self):
+        """[{seq, aba, criado_em, tentativas, erro, mutacao}] que não foram aceitas pela planilha."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT seq, aba, criado_em, tentativas, erro, mutacao FROM _pendencias WHERE morta = 1 ORDER BY seq"
+            )
+            return [
+                {"seq": q, "aba": a, "criado_em": c, "tentativas": t, "erro": e, "mutacao": json.loads(m)}
+                for q, a, c, t, e, m in cur.fetchall()
+            ]
+
+    def descartar_mortas(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM _pendencias WHERE morta = 1")
+
+    def tem_pendencias(self, aba=None):
+        with self._lock:
+            if aba is None:
+                cur = self._conn.execute("SELECT COUNT(*) FROM _pendencias WHERE morta = 0")
+            else:
+                # `aba` pode ser uma lista "Produtos,Financeiro" (pendência de transacao)
+                cur = self._conn.execute(
+                    "SELECT COUNT(*) FROM _pendencias WHERE morta = 0 AND instr(',' || aba || ',', ?) > 0",
+                    (f",{aba},",),
+                )
+            return cur.fetchone()[0]
+
+
+class DiarioOperacoes:
+    """
+    Diário local (SQLite) das operações de várias abas (venda, mala, compra).
+
+    Antes de mexer na planilha, a operação é gravada com as mutações e as
+    mutações que a desfazem; `feitos` conta os passos já aplicados. Se o
+    processo cair ou a planilha falhar no meio, o que ficou em 'aplicando' ou
+    'desfazendo' é desfeito depois (database.recuperar_operacoes).
+    """
+
+    def __init__(self, caminho):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS _operacoes ("
+            " id TEXT PRIMARY KEY, nome TEXT, processo TEXT, criado_em REAL, estado TEXT,"
+            " feitos INTEGER, mutacoes TEXT, desfazer TEXT, erro TEXT)"
+        )
+
+    def registrar(self, op_id, nome, processo, mutacoes, desfazer):
+        # REPLACE: uma transação do espelho que volta da fila reusa o id
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO _operacoes VALUES (?, ?, ?, ?, 'aplicando', 0, ?, ?, NULL)",
+                (op_id, nome, processo, time.time(), json.dumps(mutacoes, default=str), json.dumps(desfazer, default=str)),
+            )
+
+    def avancar(self, op_id, feitos):
+        with self._lock:
+            self._conn.execute("UPDATE _operacoes SET feitos = ? WHERE id = ?", (feitos, op_id))
+
+    def marcar(self, op_id, estado, erro=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE _operacoes SET estado = ?, erro = COALESCE(?, erro) WHERE id = ?", (estado, erro, op_id)
+            )
+
+    def _consultar(self, onde, params=()):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT id, nome, processo, criado_em, estado, feitos, mutacoes, desfazer FROM _operacoes"
+                f" WHERE {onde} ORDER BY criado_em", params
+            )
+            linhas = cur.fetchall()
+        return [
+            {"id": i, "nome": n, "processo": p, "criado_em": c, "estado": e, "feitos": f,
+             "mutacoes": json.loads(m), "desfazer": json.loads(d)}
+            for i, n, p, c, e, f, m, d in linhas
+        ]
+
+    def abertas(self):
+        """[{id, nome, processo, criado_em, estado, feitos, mutacoes, desfazer}] que não terminaram."""
+        return self._consultar("estado IN ('aplicando', 'desfazendo')")
+
+    def operacao(self, op_id):
+        """A operação do diário com esse id (mesmo formato do abertas), ou None."""
+        achadas = self._consultar("id = ?", (op_id,))
+        return achadas[0] if achadas else None
+
+
+def _nome_coluna(cab, chave):
+    """Aceita número de coluna (1 = A) ou o nome do cabeçalho."""
+    if isinstance(chave, int) or str(chave).isdigit():
+        return cab[int(chave) - 1]
+    return chave
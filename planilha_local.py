@@ -0,0 +1,284 @@
+import csv
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+import gspread
+from gspread.cell import Cell
+from gspread.utils import a1_range_to_grid_range, numericise_all
+
+# Cabeçalhos usados quando a aba ainda não existe na pasta local
+CABECALHOS = {
+    "Produtos": ["id", "nome", "tamanho", "preco_custo", "preco_venda", "status"],
+    "Clientes": ["id", "nome", "whatsapp", "endereco"],
+    "Malas": ["id", "id_cliente", "nome_cliente", "data_envio", "lista_ids_produtos", "status", "data_prevista"],
+    "Financeiro": ["id", "data_lancamento", "data_vencimento", "tipo", "descricao", "valor", "forma_pagamento", "status_pagamento"],
+    "Fechamentos": ["mes_ano", "status"],
+    "Configuracoes": ["parametro", "valor"],
+}
+
+
+class _Resposta:
+    status_code = 429
+
+
+class ErroCota(Exception):
+    """Imita o APIError 429 do gspread (o database.py olha `response.status_code`)."""
+
+    def __init__(self, mensagem):
+        super().__init__(mensagem)
+        self.response = _Resposta()
+
+
+def _texto(valor):
+    """Como a planilha devolve o valor gravado: sempre texto, 30.0 vira '30'."""
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "TRUE" if valor else "FALSE"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _aparar(linhas):
+    """Tira linhas vazias do fim e células vazias do fim de cada linha (como a API)."""
+    linhas = [list(l) for l in linhas]
+    for l in linhas:
+        while l and l[-1] == "":
+            l.pop()
+    while linhas and not linhas[-1]:
+        linhas.pop()
+    return linhas
+
+
+class AbaLocal:
+    """
+    Subconjunto da gspread.Worksheet usado pelo app, guardado num CSV.
+    Cada método público conta como uma requisição (latência e cota da planilha).
+    Leituras e escritas (alterar as linhas + salvar o CSV) passam pela trava
+    da aba: várias sessões e a thread de envio usam a mesma AbaLocal.
+    """
+
+    def __init__(self, planilha, titulo, caminho):
+        self._planilha = planilha
+        self.title = titulo
+        self._caminho = caminho
+        self._lock = threading.RLock()
+        with open(caminho, newline="", encoding="utf-8") as f:
+            self._linhas = [list(l) for l in csv.reader(f)]
+
+    def __repr__(self):
+        return f"<AbaLocal {self.title!r}>"
+
+    # --- INTERNO ---
+
+    def _req(self, operacao):
+        self._planilha._requisicao(self.title, operacao)
+
+    def _salvar(self):
+        temporario = self._caminho + ".tmp"
+        with open(temporario, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(self._linhas)
+        os.replace(temporario, self._caminho)
+        self._planilha._alterada()
+
+    def _ultima_linha(self):
+        n = len(self._linhas)
+        while n and not any(self._linhas[n - 1]):
+            n -= 1
+        return n
+
+    def _gravar(self, linha, coluna, valor):
+        while len(self._linhas) < linha:
+            self._linhas.append([])
+        atual = self._linhas[linha - 1]
+        while len(atual) < coluna:
+            atual.append("")
+        atual[coluna - 1] = _texto(valor)
+
+    def _faixa(self, a1):
+        g = a1_range_to_grid_range(a1)
+        r0, c0 = g.get("startRowIndex", 0), g.get("startColumnIndex", 0)
+        r1 = g.get("endRowIndex", len(self._linhas))
+        c1 = g.get("endColumnIndex", max((len(l) for l in self._linhas), default=0))
+        return _aparar(l[c0:c1] for l in self._linhas[r0:r1])
+
+    # --- LEITURA ---
+
+    def get_all_values(self):
+        self._req("get_all_values")
+        with self._lock:
+            linhas = _aparar(self._linhas)
+            largura = max((len(l) for l in linhas), default=0)
+            return [l + [""] * (largura - len(l)) for l in linhas]
+
+    def get_all_records(self):
+        self._req("get_all_records")
+        with self._lock:
+            linhas = _aparar(self._linhas)
+            if not linhas:
+                return []
+            cab = linhas[0]
+            return [dict(zip(cab, numericise_all((l + [""] * len(cab))[:len(cab)]))) for l in linhas[1:]]
+
+    def batch_get(self, ranges, **kwargs):
+        self._req("batch_get")
+        with self._lock:
+            return [self._faixa(r) for r in ranges]
+
+    def row_values(self, row):
+        self._req("row_values")
+        with self._lock:
+            return _aparar([self._linhas[row - 1]])[0] if row <= len(self._linhas) else []
+
+    def col_values(self, col):
+        self._req("col_values")
+        with self._lock:
+            return [l[0] if l else "" for l in _aparar([l[col - 1:col] for l in self._linhas])]
+
+    def cell(self, row, col):
+        self._req("cell")
+        with self._lock:
+            linha = self._linhas[row - 1] if row <= len(self._linhas) else []
+            return Cell(row, col, linha[col - 1] if col <= len(linha) else "")
+
+    def find(self, query, in_row=None, in_column=None):
+        self._req("find")
+        with self._lock:
+            for r, linha in enumerate(self._linhas, start=1):
+                if in_row and r != in_row:
+                    continue
+                for c, valor in enumerate(linha, start=1):
+                    if (not in_column or c == in_column) and valor == str(query):
+                        return Cell(r, c, valor)
+            return None
+
+    # --- ESCRITA ---
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._req("append_rows")
+        with self._lock:
+            inicio = self._ultima_linha() + 1
+            del self._linhas[inicio - 1:]
+            self._linhas.extend([_texto(v) for v in linha] for linha in values)
+            self._salvar()
+            largura = max((len(l) for l in values), default=1)
+            fim_col = Cell(1, max(largura, 1)).address[:-1]
+            return {
+                "updates": {
+                    "updatedRange": f"{self.title}!A{inicio}:{fim_col}{inicio + len(values) - 1}",
+                    "updatedRows": len(values),
+                }
+            }
+
+    def update_cell(self, row, col, value):
+        self._req("update_cell")
+        with self._lock:
+            self._gravar(row, col, value)
+            self._salvar()
+
+    def update_cells(self, cell_list, value_input_option="RAW"):
+        self._req("update_cells")
+        with self._lock:
+            for c in cell_list:
+                self._gravar(c.row, c.col, c.value)
+            self._salvar()
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._req("update")
+        with self._lock:
+            # Aceita também a ordem antiga update(range_name, values)
+            if isinstance(values, str):
+                values, range_name = range_name, values
+            g = a1_range_to_grid_range(range_name or "A1")
+            r0, c0 = g.get("startRowIndex", 0) + 1, g.get("startColumnIndex", 0) + 1
+            for i, linha in enumerate(values):
+                for j, valor in enumerate(linha):
+                    self._gravar(r0 + i, c0 + j, valor)
+            self._salvar()
+
+    def delete_rows(self, start_index, end_index=None):
+        self._req("delete_rows")
+        with self._lock:
+            del self._linhas[start_index - 1:(end_index or start_index)]
+            self._salvar()
+
+    def clear(self):
+        self._req("clear")
+        with self._lock:
+            self._linhas = []
+            self._salvar()
+
+
+class PlanilhaLocal:
+    """
+    Substituto offline do gspread.Spreadsheet: uma pasta com um CSV por aba.
+
+    - `latencia_ms`: espera artificial em cada requisição (simula a rede).
+    - `cota_por_minuto`: limite de requisições numa janela de 60 s; acima
+      dele a chamada levanta ErroCota (429), como a API do Google. 0 = sem limite.
+    - `chamadas`: Counter de requisições por (aba, operação).
+    """
+
+    def __init__(self, pasta, latencia_ms=0, cota_por_minuto=0, title="FL Boutique Sistema"):
+        self.title = title
+        self.pasta = pasta
+        self.latencia_ms = float(latencia_ms)
+        self.cota_por_minuto = int(cota_por_minuto)
+        self.chamadas = Counter()
+        self._janela = deque()
+        self._abas = {}
+        self._lock = threading.Lock()
+        self._atualizada_em = time.time()
+        os.makedirs(pasta, exist_ok=True)
+
+    def _requisicao(self, aba, operacao):
+        with self._lock:
+            agora = time.time()
+            while self._janela and agora - self._janela[0] > 60:
+                self._janela.popleft()
+            if self.cota_por_minuto and len(self._janela) >= self.cota_por_minuto:
+                raise ErroCota(f"429: cota de {self.cota_por_minuto} requisições/minuto excedida")
+            self._janela.append(agora)
+            self.chamadas[(aba, operacao)] += 1
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+
+    def _alterada(self):
+        self._atualizada_em = time.time()
+
+    def total_chamadas(self):
+        return sum(self.chamadas.values())
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.chamadas.clear()
+
+    def get_lastUpdateTime(self):
+        # Consulta ao Drive: também conta como requisição (latência e cota)
+        self._requisicao(self.title, "get_lastUpdateTime")
+        return datetime.fromtimestamp(self._atualizada_em, timezone.utc).isoformat()
+
+    def worksheet(self, title):
+        with self._lock:
+            aba = self._abas.get(title)
+            if aba is None:
+                caminho = os.path.join(self.pasta, f"{title}.csv")
+                if not os.path.exists(caminho):
+                    if title not in CABECALHOS:
+                        raise gspread.WorksheetNotFound(title)
+                    with open(caminho, "w", newline="", encoding="utf-8") as f:
+                        csv.writer(f).writerow(CABECALHOS[title])
+                aba = self._abas[title] = AbaLocal(self, title, caminho)
+        self._requisicao(title, "worksheet")
+        return aba
+
+    def worksheets(self):
+        nomes = {os.path.splitext(n)[0] for n in os.listdir(self.pasta) if n.endswith(".csv")}
+        return [self.worksheet(n) for n in sorted(nomes | set(CABECALHOS))]
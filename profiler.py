@@ -0,0 +1,96 @@
+import cProfile
+import os
+import pstats
+import time
+
+import streamlit as st
+import pandas as pd
+
+import database as db
+
+# Pastas/módulos de cada grupo, comparados com o caminho do arquivo da função
+_BUSCA = tuple(os.path.join(os.path.dirname(os.path.abspath(__file__)), m)
+               for m in ("database.py", "local_store.py", "planilha_local.py"))
+_STREAMLIT = os.path.dirname(os.path.abspath(st.__file__))
+
+
+def ativo():
+    """Ligado pelo FL_PERFIL (todas as sessões) ou pela opção em Configurações (só esta sessão)."""
+    return db.PERFILAR or st.session_state.get("perfil", False)
+
+
+def _grupo(arquivo):
+    if arquivo.startswith(_BUSCA):
+        return "busca"
+    if arquivo.startswith(_STREAMLIT):
+        return "render"
+    return None
+
+
+def _dividir_tempo(stats, total_ms):
+    """
+    Divide o tempo da tela em busca de dados, renderização e transformação.
+    Usa as arestas chamador → chamado do cProfile: entra em 'busca' o tempo
+    acumulado das chamadas das telas (e utils/kpis) para o database.py e em
+    'render' o das chamadas delas para o Streamlit. O que sobra é
+    pandas/Python das próprias telas (transformação).
+    """
+    busca = render = 0.0
+    for (arquivo, _, _), (_, _, _, _, chamadores) in stats.stats.items():
+        grupo = _grupo(arquivo)
+        if grupo is None:
+            continue
+        for (arq_chamador, _, _), (_, _, _, acumulado) in chamadores.items():
+            if _grupo(arq_chamador) is not None:
+                # Chamada de dentro de um dos grupos (interna, st.error do database,
+                # cache_resource do Streamlit voltando para o database): já contada
+                continue
+            if grupo == "busca":
+                busca += acumulado
+            else:
+                render += acumulado
+    busca, render = busca * 1000, render * 1000
+    return {"busca": busca, "render": render, "transformacao": max(total_ms - busca - render, 0.0)}
+
+
+def _pontos_quentes(stats, limite=15):
+    linhas = []
+    for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in stats.stats.items():
+        linhas.append({
+            "função": f"{os.path.basename(arquivo)}:{linha}({funcao})",
+            "chamadas": chamadas,
+            "próprio (ms)": round(proprio * 1000, 2),
+            "acumulado (ms)": round(acumulado * 1000, 2),
+        })
+    linhas.sort(key=lambda l: l["próprio (ms)"], reverse=True)
+    return linhas[:limite]
+
+
+def executar(tela, nome):
+    """Roda a função da tela; com o perfil ligado, mede e mostra o resultado embaixo."""
+    if not ativo():
+        return tela()
+
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError:
+        # Outro profiler já está ativo neste processo
+        return tela()
+    inicio = time.perf_counter()
+    try:
+        tela()
+    finally:
+        # st.rerun()/st.stop() saem por exceção: só desliga e deixa subir
+        perfil.disable()
+    total_ms = (time.perf_counter() - inicio) * 1000
+
+    stats = pstats.Stats(perfil)
+    partes = _dividir_tempo(stats, total_ms)
+    with st.expander(f"⏱️ Perfil: {nome} ({total_ms:.0f} ms)", expanded=False):
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Total", f"{total_ms:.0f} ms")
+        c2.metric("Busca de dados", f"{partes['busca']:.0f} ms")
+        c3.metric("Transformação", f"{partes['transformacao']:.0f} ms")
+        c4.metric("Renderização", f"{partes['render']:.0f} ms")
+        st.dataframe(pd.DataFrame(_pontos_quentes(stats)), use_container_width=True, hide_index=True)
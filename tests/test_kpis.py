@@ -0,0 +1,120 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kpis
+import utils as ut
+
+MES = "2026-10"
+
+
+def kpis_com_iterrows(df_fin, df_prod, mes_atual=MES):
+    """O loop antigo do Dashboard, como estava antes de kpis.calcular_kpis."""
+    prods_disp = df_prod[df_prod['status'] == 'Disponível']
+    custo_total_estoque = sum([ut.converter_input_para_float(x) for x in prods_disp['preco_custo']])
+    qtd_produtos = len(prods_disp)
+
+    receber = 0
+    caixa_bruto = 0
+    taxas_cartao = 0
+    vendas_no_mes = 0
+    valor_vendas_mes = 0
+
+    for idx, row in df_fin.iterrows():
+        val = ut.converter_input_para_float(row['valor'])
+        data_lanc = str(row['data_lancamento'])
+
+        if row['tipo'] == 'Venda' and data_lanc.startswith(mes_atual):
+            valor_vendas_mes += val
+            vendas_no_mes += 1
+        if row['tipo'] == 'Venda' and row['status_pagamento'] == 'Pendente':
+            receber += val
+        if row['status_pagamento'] == 'Pago':
+            if row['tipo'] in ['Venda', 'Entrada']:
+                caixa_bruto += val
+                forma = str(row['forma_pagamento']).lower()
+                if any(x in forma for x in ["cartão", "credito", "debito", "crédito", "débito"]):
+                    taxas_cartao += val * 0.12
+            elif row['tipo'] == 'Despesa':
+                caixa_bruto -= val
+
+    return {
+        'caixa_bruto': caixa_bruto,
+        'caixa_liquido': caixa_bruto - taxas_cartao,
+        'taxas_cartao': taxas_cartao,
+        'a_receber': receber,
+        'estoque_custo': custo_total_estoque,
+        'qtd_produtos': qtd_produtos,
+        'vendas_no_mes': vendas_no_mes,
+        'valor_vendas_mes': valor_vendas_mes,
+        'ticket_medio': valor_vendas_mes / vendas_no_mes if vendas_no_mes > 0 else 0,
+    }
+
+
+# Valores como chegam da planilha (get_all_values: célula vazia é ""):
+# formatos misturados, vazios, lixo e datas inválidas
+VALORES = ["R$ 1.234,56", "12,5", "", "abc", "99.90", "R$ 0,00", "1.000", "  7 ", "R$", "-5,25", "3,4,5"]
+DATAS = ["2026-10-01", "2026-10-31 18:00", "2026-09-30", "", "não é data", "10/2026", "31/02/2026", "2026-1"]
+TIPOS = ["Venda", "Entrada", "Despesa", "Venda", "Outro", ""]
+STATUS = ["Pago", "Pendente", "Pago", "", "Cancelado"]
+FORMAS = ["Pix", "Cartão de Crédito", "Débito", "credito 3x", "Dinheiro", ""]
+
+
+def _financeiro(n):
+    return pd.DataFrame({
+        'valor': [VALORES[i % len(VALORES)] for i in range(n)],
+        'data_lancamento': [DATAS[(i * 3) % len(DATAS)] for i in range(n)],
+        'tipo': [TIPOS[(i * 5) % len(TIPOS)] for i in range(n)],
+        'status_pagamento': [STATUS[(i * 7) % len(STATUS)] for i in range(n)],
+        'forma_pagamento': [FORMAS[(i * 2) % len(FORMAS)] for i in range(n)],
+    })
+
+
+def _produtos(n):
+    custos = ["R$ 45,00", "30", "", "xx", "1.200,00", "12.5"]
+    return pd.DataFrame({
+        'preco_custo': [custos[i % len(custos)] for i in range(n)],
+        'preco_venda': ["99,90"] * n,
+        'status': [["Disponível", "Vendido", "Em Mala", "Disponível"][i % 4] for i in range(n)],
+    })
+
+
+@pytest.mark.parametrize("n", [1, 7, 60, 500])
+def test_calcular_kpis_igual_ao_loop_antigo(n):
+    df_fin, df_prod = _financeiro(n), _produtos(n)
+    esperado = kpis_com_iterrows(df_fin, df_prod)
+    obtido = kpis.calcular_kpis(df_fin, df_prod, mes_atual=MES)
+    assert obtido.keys() == esperado.keys()
+    for chave, valor in esperado.items():
+        assert obtido[chave] == pytest.approx(valor, abs=1e-6), chave
+
+
+def test_calcular_kpis_valores_numericos():
+    # Aba lida com colunas já numéricas (get_all_records converte)
+    df_fin = _financeiro(40)
+    df_fin['valor'] = [float(i) * 1.5 for i in range(40)]
+    df_prod = _produtos(12)
+    df_prod['preco_custo'] = [10] * 12
+    esperado = kpis_com_iterrows(df_fin, df_prod)
+    obtido = kpis.calcular_kpis(df_fin, df_prod, mes_atual=MES)
+    for chave, valor in esperado.items():
+        assert obtido[chave] == pytest.approx(valor, abs=1e-6), chave
+
+
+def test_conversao_em_lote_igual_a_escalar():
+    serie = pd.Series(VALORES * 3)
+    lote = ut.converter_serie_para_float(serie)
+    assert list(lote) == pytest.approx([ut.converter_input_para_float(v) for v in serie])
+
+
+def test_celula_sem_valor_vira_zero():
+    # NaN (ex.: coluna que faltava em parte das linhas) conta como vazio;
+    # o loop antigo propagava o NaN para o total
+    df_fin = _financeiro(10)
+    df_fin.loc[0, 'valor'] = None
+    assert kpis.calcular_kpis(df_fin, _produtos(4), mes_atual=MES)['caixa_bruto'] == pytest.approx(
+        kpis_com_iterrows(df_fin.drop(index=0), _produtos(4))['caixa_bruto'])
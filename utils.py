@@ -1,5 +1,6 @@
 import database as db
 import uuid
+import pandas as pd
 from datetime import datetime, timedelta
 
 def converter_input_para_float(valor_str):
@@ -22,6 +23,53 @@ def format_brl(value):
     except:
         return str(value)
 
+# --- VERSÕES PARA COLUNAS INTEIRAS (pandas) ---
+# Mesmas regras das funções acima, mas com operações vetorizadas de string
+# em vez de .apply linha a linha.
+
+_TROCA_SEPARADORES = str.maketrans({",": ".", ".": ","})
+_NUMERO = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+
+def converter_serie_para_float(serie):
+    """
+    Converte uma coluna inteira: "R$ 1.234,56", "1234.56", números e células
+    vazias (que viram 0.0). Retorna uma Series float64.
+    """
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype(float).fillna(0.0)
+    texto = (serie.astype(str)
+             .str.replace("R$", "", regex=False)
+             .str.replace(" ", "", regex=False)
+             .str.strip())
+    # "1.234,56": o ponto é separador de milhar
+    milhar = texto.str.contains(".", regex=False, na=False) & texto.str.contains(",", regex=False, na=False)
+    texto = texto.where(~milhar, texto.str.replace(".", "", regex=False))
+    texto = texto.str.replace(",", ".", regex=False)
+    # O que não for número vira 0.0, como no except da versão escalar
+    valido = texto.str.fullmatch(_NUMERO, na=False).astype(bool)
+    numeros = pd.Series(0.0, index=serie.index)
+    numeros[valido] = texto[valido].astype(float)
+    return numeros
+
+def format_brl_serie(serie):
+    """Formata uma coluna como "R$ 1.234,56". Vazios viram "R$ 0,00" e textos não numéricos ficam como estão."""
+    numerica = pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie)
+    if numerica:
+        numeros = serie.astype(float)
+        vazio = numeros.isna()
+    else:
+        texto = serie.astype(str).str.strip()
+        numeros = pd.to_numeric(texto, errors="coerce")
+        vazio = serie.isna() | (texto == "")
+    # format/translate são feitos em C; evita o try/except e os 3 replace por linha
+    formatado = pd.Series(
+        ["R$ " + f.translate(_TROCA_SEPARADORES) for f in map("{:,.2f}".format, numeros.tolist())],
+        index=serie.index, dtype=object,
+    )
+    if not numerica:
+        formatado = formatado.where(numeros.notna(), serie.astype(str))
+    return formatado.where(~vazio, "R$ 0,00") if vazio.any() else formatado
+
 def format_data_br(data_iso):
     """Converte AAAA-MM-DD para DD/MM/AAAA."""
     try:
@@ -110,13 +158,21 @@ def calcular_preco_sugerido(custo_produto):
     try:
         if custo_produto <= 0: return 0.0
         
-        # Pega do banco (ou usa padrão se falhar)
-        conf = db.get_configs()
-        c_fixo = conf.get('custo_fixo', 1.06)
-        markup = conf.get('markup', 2.0)
-        t_extra = conf.get('taxa_extra', 1.12)
+        # Parâmetros em cache (ou padrão se faltar algum)
+        p = db.get_parametros()
         
-        sugestao = (custo_produto + c_fixo) * markup * t_extra
+        sugestao = (custo_produto + p.custo_fixo) * p.markup * p.taxa_extra
         return round(sugestao, 2)
     except:
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+def calcular_precos_sugeridos(custos):
+    """
+    Versão para vários custos de uma vez (carrinho de compra, catálogo inteiro).
+    Aceita Series ou lista; custos vazios, inválidos ou <= 0 dão 0.0.
+    """
+    serie = custos if isinstance(custos, pd.Series) else pd.Series(custos, dtype=object)
+    valores = converter_serie_para_float(serie)
+    p = db.get_parametros()
+    sugestao = ((valores + p.custo_fixo) * p.markup * p.taxa_extra).round(2)
+    return sugestao.where(valores > 0, 0.0)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 import database as db
+import busca
 import uuid
 
 
@@ -34,25 +35,22 @@ def show_clientes():
 
     with t2:
         if not df.empty:
-            copts = {r['nome']: r['id'] for i, r in df.iterrows()}
-            lista_edit = sorted(list(copts.keys()))
-            
-            sel = st.selectbox("Editar", lista_edit)
-            row = df[df['id']==copts[sel]].iloc[0]
-            with st.form("ed_cli"):
-                nn = st.text_input("Nome", row['nome'])
-                nw = st.text_input("Zap", row['whatsapp'])
-                ne = st.text_input("End", row['endereco'])
-                if st.form_submit_button("Salvar"):
-                    db.update_data("Clientes", copts[sel], {2:nn, 3:nw, 4:ne})
-                    st.success("Ok!")
-                    st.rerun()
+            busca_cli = db.get_busca_clientes()
+            cid = busca.caixa_busca("Editar", busca_cli, key="ed_cid")
+            if cid is not None:
+                row = df[df['id'].astype(str)==cid].iloc[0]
+                with st.form("ed_cli"):
+                    nn = st.text_input("Nome", row['nome'])
+                    nw = st.text_input("Zap", row['whatsapp'])
+                    ne = st.text_input("End", row['endereco'])
+                    if st.form_submit_button("Salvar"):
+                        db.update_data("Clientes", cid, {"nome": nn, "whatsapp": nw, "endereco": ne})
+                        st.success("Ok!")
+                        st.rerun()
     with t3:
         if not df.empty:
-            copts = {r['nome']: r['id'] for i, r in df.iterrows()}
-            lista_del = sorted(list(copts.keys()))
-            sel_d = st.selectbox("Excluir", lista_del, key='del_c')
-            if st.button("Apagar"):
-                db.delete_data("Clientes", copts[sel_d])
+            cid_d = busca.caixa_busca("Excluir", db.get_busca_clientes(), key='del_c')
+            if st.button("Apagar", disabled=(cid_d is None)):
+                db.delete_data("Clientes", cid_d)
                 st.success("Apagado!")
                 st.rerun()
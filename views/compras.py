@@ -69,14 +69,16 @@ def show_compras():
         # Mostra tabela do carrinho
         df_cart = pd.DataFrame(st.session_state.carrinho_compra)
         df_cart['Total Custo'] = df_cart['custo'] * df_cart['qtd']
+        df_cart['Sugestão'] = ut.calcular_precos_sugeridos(df_cart['custo'])
         
         # Formata para exibir
         df_show = df_cart.copy()
-        df_show['custo'] = df_show['custo'].apply(ut.format_brl)
-        df_show['venda'] = df_show['venda'].apply(ut.format_brl)
-        df_show['Total Custo'] = df_show['Total Custo'].apply(ut.format_brl)
+        df_show['custo'] = ut.format_brl_serie(df_show['custo'])
+        df_show['venda'] = ut.format_brl_serie(df_show['venda'])
+        df_show['Total Custo'] = ut.format_brl_serie(df_show['Total Custo'])
+        df_show['Sugestão'] = ut.format_brl_serie(df_show['Sugestão'])
         
-        st.dataframe(df_show[['nome', 'tamanho', 'qtd', 'custo', 'Total Custo']], use_container_width=True)
+        st.dataframe(df_show[['nome', 'tamanho', 'qtd', 'custo', 'venda', 'Sugestão', 'Total Custo']], use_container_width=True)
         
         total_pedido = df_cart['Total Custo'].sum()
         qtd_total_pecas = df_cart['qtd'].sum()
@@ -142,29 +144,30 @@ def show_compras():
                                 "Disponível"
                             ])
                     
-                    # 2. SALVAR PRODUTOS EM LOTE
-                    if db.append_data_batch("Produtos", novos_produtos):
-                        
-                        # 3. GERAR FINANCEIRO COM DATAS PERSONALIZADAS
-                        lancs = ut.gerar_lancamentos(
-                            total=total_pedido, 
-                            parcelas=parc, 
-                            forma=forma, 
-                            cli=fornecedor, 
-                            origem_texto="Compra Estoque", 
-                            data_base=data_compra,
-                            datas_customizadas=datas_compra, # Passando as datas escolhidas
-                            tipo="Despesa"
-                        )
-                        
-                        db.append_data_batch("Financeiro", lancs)
-                        
+                    # 2. GERAR FINANCEIRO COM DATAS PERSONALIZADAS
+                    lancs = ut.gerar_lancamentos(
+                        total=total_pedido, 
+                        parcelas=parc, 
+                        forma=forma, 
+                        cli=fornecedor, 
+                        origem_texto="Compra Estoque", 
+                        data_base=data_compra,
+                        datas_customizadas=datas_compra, # Passando as datas escolhidas
+                        tipo="Despesa"
+                    )
+                    
+                    # 3. SALVAR PRODUTOS E DESPESA JUNTOS (tudo ou nada)
+                    compra = db.Transacao(f"Compra Estoque - {fornecedor}")
+                    compra.incluir("Produtos", novos_produtos)
+                    compra.incluir("Financeiro", lancs)
+                    
+                    if compra.confirmar():
                         st.success(f"Sucesso! {qtd_total_pecas} peças cadastradas e Despesa de {ut.format_brl(total_pedido)} lançada.")
                         st.session_state.carrinho_compra = []
                         time.sleep(2)
                         st.rerun()
                     else:
-                        st.error("Erro ao salvar produtos. Tente novamente.")
+                        st.error("Erro ao salvar a compra. Nada foi gravado; tente novamente.")
                 else:
                     st.warning("Informe o Fornecedor antes de finalizar.")
     else:
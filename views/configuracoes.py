@@ -1,6 +1,10 @@
 import streamlit as st
 import database as db
 import time
+from datetime import datetime
+
+def _guardar_perfil():
+    st.session_state["perfil"] = st.session_state["perfil_toggle"]
 
 def show_configuracoes():
     st.header("⚙️ Configurações do Sistema")
@@ -57,4 +61,51 @@ def show_configuracoes():
             if db.save_configs(novos_dados):
                 st.success("Configurações atualizadas com sucesso!")
                 time.sleep(1.5)
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+    # --- SINCRONIZAÇÃO (ESPELHO LOCAL) ---
+    if db.USAR_ESPELHO:
+        st.divider()
+        st.subheader("🔄 Sincronização com a Planilha")
+        fila = db.status_fila()
+        st.caption(f"Leituras servidas pela cópia local (SQLite). Escritas aguardando envio: {fila['pendentes']}")
+        if db.USAR_WRITE_BEHIND:
+            latencia = f"{fila['ultimo_flush_ms']:.0f} ms" if fila['ultimo_flush_ms'] is not None else "-"
+            st.caption(f"Envio em segundo plano ativo. Último envio: {latencia} · Total enviado: {fila['enviadas']}")
+            if fila['ultimo_erro']:
+                st.warning(fila['ultimo_erro'])
+        if fila['conflitos']:
+            st.warning(f"{fila['conflitos']} peça(s) reservada(s) aqui já tinham mudado na planilha; "
+                       "vale o que está na planilha. Confira as últimas vendas/malas.")
+        if fila['recusadas']:
+            st.warning("Operações feitas aqui e recusadas pela planilha no envio (nada delas foi gravado): "
+                       + ", ".join(f"{r['nome']} ({datetime.fromtimestamp(r['em']):%d/%m %H:%M})"
+                                   for r in fila['recusadas']))
+        if fila['mortas']:
+            st.error(f"{len(fila['mortas'])} escrita(s) recusada(s) pela planilha e retirada(s) da fila. "
+                     "Confira os dados abaixo e refaça pela tela, se necessário.")
+            st.dataframe(
+                [{"aba": p["aba"], "operação": p["mutacao"]["op"], "tentativas": p["tentativas"], "erro": p["erro"]}
+                 for p in fila['mortas']],
+                use_container_width=True, hide_index=True
+            )
+            if st.button("Descartar escritas recusadas"):
+                db.descartar_pendencias_mortas()
+                st.rerun()
+        if st.button("Sincronizar Agora"):
+            if db.sincronizar(completa=True):
+                st.success("Planilha sincronizada!")
+                time.sleep(1)
+                st.rerun()
+
+    # --- DESEMPENHO ---
+    st.divider()
+    st.subheader("⏱️ Desempenho")
+    if db.PERFILAR:
+        st.caption("Perfil ligado para todas as sessões (FL_PERFIL).")
+    else:
+        # O estado de um widget some quando ele não é desenhado (outra tela):
+        # a opção fica guardada em "perfil", que o profiler lê
+        st.toggle("Medir o tempo de cada tela (só nesta sessão)", key="perfil_toggle",
+                  value=st.session_state.get("perfil", False), on_change=_guardar_perfil,
+                  help="Mostra, embaixo de cada tela, o tempo gasto buscando dados, transformando e desenhando, e as funções mais lentas.")
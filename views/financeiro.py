@@ -2,7 +2,6 @@ import streamlit as st
 import utils as ut
 import database as db
 import uuid
-import pandas as pd
 from datetime import datetime
 
 def show_financeiro():
@@ -14,25 +13,17 @@ def show_financeiro():
     with t1:
         if not df.empty:
             # 1. Preparar Dados
-            df_show = df.drop(columns=['id'], errors='ignore').copy()
-            
-            # Converte colunas de data para o tipo DATETIME (para ordenar corretamente)
-            # O errors='coerce' transforma datas inválidas em NaT (Not a Time) para não quebrar
-            if 'data_lancamento' in df_show.columns:
-                df_show['data_lancamento'] = pd.to_datetime(df_show['data_lancamento'], errors='coerce')
-                
-            if 'data_vencimento' in df_show.columns:
-                df_show['data_vencimento'] = pd.to_datetime(df_show['data_vencimento'], errors='coerce')
-            
-            # Converte valor para float para ordenar corretamente pelo preço também, se quiser
-            df_show['valor_num'] = df_show['valor'].apply(ut.converter_input_para_float)
+            # A versão tipada já traz as datas em DATETIME (inválidas viram NaT)
+            # e o valor em float, então ordena certo sem converter aqui
+            df_show = db.load_typed_data("Financeiro").drop(columns=['id'], errors='ignore')
+            df_show['valor_num'] = df_show['valor']
 
             # 2. Ordenação Padrão (Data de Vencimento)
             df_show = df_show.sort_values(by='data_vencimento', ascending=True)
 
             # 3. Formatação Visual (Moeda)
             # Criamos uma coluna visual, mas mantemos a original ou usamos column_config do Streamlit
-            df_show['valor_fmt'] = df_show['valor_num'].apply(ut.format_brl)
+            df_show['valor_fmt'] = ut.format_brl_serie(df_show['valor_num'])
             
             # Selecionar colunas finais para exibir
             cols_to_show = ['data_lancamento', 'data_vencimento', 'tipo', 'descricao', 'valor_num', 'forma_pagamento', 'status_pagamento']
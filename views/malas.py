@@ -1,11 +1,32 @@
 import streamlit as st
 import utils as ut
 import database as db
+import busca
 import uuid
 import pandas as pd
 from datetime import datetime, timedelta
 import time
 
+def itens_da_mala(prod_idx, lista_ids):
+    """
+    Resolve os ids de uma mala numa busca só no Produtos indexado por id.
+    Retorna (itens encontrados na ordem da mala, [ids que não existem mais]).
+    """
+    ids = pd.Index([i.strip() for i in str(lista_ids).split(',') if i.strip()])
+    existe = ids.isin(prod_idx.index)
+    return prod_idx.loc[ids[existe]], list(ids[~existe])
+
+def apurar_retorno(prod_idx, devs):
+    """
+    Recebe {id_produto: devolveu?} e devolve ({id: novo status}, total a pagar).
+    Devolvidas voltam a 'Disponível'; as que ficaram com a cliente viram 'Vendido'.
+    `prod_idx` é o Produtos de db.load_indexed_data (preço já em float).
+    """
+    upd = {pid: ("Disponível" if dev else "Vendido") for pid, dev in devs.items()}
+    vendidos = [pid for pid, dev in devs.items() if not dev]
+    tot = float(prod_idx['preco_venda'].reindex(vendidos).fillna(0.0).sum())
+    return upd, tot
+
 def show_malas():
     st.header("👜 Malas")
     
@@ -14,47 +35,54 @@ def show_malas():
     
     df_c = db.load_data("Clientes")
     df_p = db.load_data("Produtos")
+    prod_idx = db.load_indexed_data("Produtos") # Busca por id (retorno/histórico)
     df_m = db.load_data("Malas") # Carrega aqui para usar em todas as abas
     
     # --- ABA 1: ENVIAR ---
     with t1:
         if not df_c.empty and not df_p.empty:
-            with st.form("mal_env"):
-                # ORDENAÇÃO
-                lista_clientes_mala = sorted(df_c['nome'].unique())
-                cl = st.selectbox("Cliente", lista_clientes_mala)
-                
-                dp = df_p[df_p['status']=='Disponível']
-                pm = {f"{r['nome']} {r['tamanho']}": r['id'] for i,r in dp.iterrows()}
-                sl = st.multiselect("Peças", list(pm.keys()))
-                
-                # DATA FORMATADA
-                dt_prev = st.date_input("Previsão de Retorno", datetime.now() + timedelta(days=3), format="DD/MM/YYYY")
-                
-                if st.form_submit_button("Enviar Mala"):
-                    if sl:
-                        ids = ",".join([pm[x] for x in sl])
-                        cid = df_c[df_c['nome']==cl]['id'].values[0]
-                        
-                        # ATUALIZAÇÃO EM LOTE (BATCH)
-                        upd = {pm[x]: "Em Mala" for x in sl}
-                        
-                        if db.update_product_status_batch(upd):
-                            db.append_data("Malas", [
-                                str(uuid.uuid4()), 
-                                cid, 
-                                cl, 
-                                datetime.now().strftime("%Y-%m-%d"), 
-                                ids, 
-                                "Aberta", 
-                                dt_prev.strftime("%Y-%m-%d")
-                            ])
-                            st.success(f"Mala enviada com {len(sl)} itens!")
-                            st.rerun()
-                        else:
-                            st.error("Erro ao atualizar estoque. Tente novamente.")
+            # Fora de st.form: a busca precisa rodar a cada letra digitada
+            busca_cli = db.get_busca_clientes()
+            cid = busca.caixa_busca("Cliente", busca_cli, key="mal_cli")
+            
+            # Só peças disponíveis; a seleção fica guardada entre as buscas
+            sl = busca.multi_busca("Peças", db.get_busca_produtos(disponiveis=True), key="mal_pecas")
+            
+            # DATA FORMATADA
+            dt_prev = st.date_input("Previsão de Retorno", datetime.now() + timedelta(days=3), format="DD/MM/YYYY")
+            
+            if st.button("Enviar Mala", disabled=(cid is None)):
+                if sl:
+                    ids = ",".join(sl)
+                    cl = busca_cli.rotulo(cid)
+                    
+                    # RESERVA EM LOTE: só entram na mala as peças que ainda estão 'Disponível';
+                    # a mala só é gravada junto com a reserva (tudo ou nada)
+                    envio = db.Transacao(f"Envio de Mala - {cl}")
+                    envio.reservar({pid: "Em Mala" for pid in sl})
+                    envio.incluir("Malas", [[
+                        str(uuid.uuid4()), 
+                        cid, 
+                        cl, 
+                        datetime.now().strftime("%Y-%m-%d"), 
+                        ids, 
+                        "Aberta", 
+                        dt_prev.strftime("%Y-%m-%d")
+                    ]])
+                    
+                    if envio.confirmar():
+                        st.session_state.pop("mal_pecas", None)
+                        st.success(f"Mala enviada com {len(sl)} itens!")
+                        st.rerun()
+                    elif envio.conflitos:
+                        # Já saem da lista de peças no próximo rerun
+                        rotulos = db.get_busca_produtos().rotulo
+                        st.error(f"Peça(s) não estão mais disponíveis (vendidas ou em outra mala): "
+                                 f"{', '.join(rotulos(pid) for pid in envio.conflitos)}. Revise a seleção.")
                     else:
-                        st.warning("Selecione pelo menos uma peça.")
+                        st.error("Erro ao atualizar estoque. Tente novamente.")
+                else:
+                    st.warning("Selecione pelo menos uma peça.")
 
     # --- ABA 2: RETORNO ---
     with t2:
@@ -69,25 +97,23 @@ def show_malas():
 
                 sel = st.selectbox("Selecionar Mala", list(m_op.keys()))
                 row = abs[abs['id']==m_op[sel]].iloc[0]
-                lids = str(row['lista_ids_produtos']).split(',')
+                itens, faltando = itens_da_mala(prod_idx, row['lista_ids_produtos'])
                 
                 st.markdown(f"### 👜 Mala de: {row['nome_cliente']}")
                 st.caption("Desmarque os itens que a cliente COMPROU (ficou com ela).")
+                if faltando:
+                    st.warning(f"{len(faltando)} peça(s) da mala não existem mais no cadastro: {', '.join(faltando)}")
                 
                 devs = {}
                 total_mala = 0.0
                 total_pagar = 0.0
                 
-                for pid in lids:
-                    pi = df_p[df_p['id']==pid]
-                    if not pi.empty:
-                        val = ut.converter_input_para_float(pi['preco_venda'].values[0])
-                        val_fmt = ut.format_brl(val)
-                        nome = pi['nome'].values[0]
-                        total_mala += val
-                        is_ret = st.checkbox(f"DEVOLVEU: {nome} ({val_fmt})", True, key=pid)
-                        devs[pid] = is_ret
-                        if not is_ret: total_pagar += val
+                for pid, nome, val in zip(itens.index, itens['nome'], itens['preco_venda']):
+                    val_fmt = ut.format_brl(val)
+                    total_mala += val
+                    is_ret = st.checkbox(f"DEVOLVEU: {nome} ({val_fmt})", True, key=pid)
+                    devs[pid] = is_ret
+                    if not is_ret: total_pagar += val
                 
                 st.divider()
                 c_tot1, c_tot2 = st.columns(2)
@@ -108,25 +134,28 @@ def show_malas():
                         datas_mala.append(d)
                 
                 if st.button("Processar Retorno"):
-                    upd = {}
-                    tot = 0
-                    for pid, dev in devs.items():
-                        val = ut.converter_input_para_float(df_p[df_p['id']==pid]['preco_venda'].values[0])
-                        if dev: upd[pid] = "Disponível"
-                        else: 
-                            upd[pid] = "Vendido"
-                            tot += val
+                    upd, tot = apurar_retorno(prod_idx, devs)
                     
-                    if db.update_product_status_batch(upd):
-                        if tot > 0:
-                            for l in ut.gerar_lancamentos(tot, pa, fp, row['nome_cliente'], "Mala", data_base=datetime.now(), datas_customizadas=datas_mala, tipo="Venda"): 
-                                db.append_data("Financeiro", l)
-                        
-                        # Atualiza status da mala para Finalizada
-                        db.update_data("Malas", m_op[sel], {6: "Finalizada"})
+                    # Estoque, financeiro e status da mala gravados juntos (tudo ou nada)
+                    retorno = db.Transacao(f"Retorno de Mala - {row['nome_cliente']}")
+                    for pid, status in upd.items():
+                        retorno.atualizar("Produtos", pid, {"status": status})
+                    if tot > 0:
+                        retorno.incluir("Financeiro", ut.gerar_lancamentos(tot, pa, fp, row['nome_cliente'], "Mala", data_base=datetime.now(), datas_customizadas=datas_mala, tipo="Venda"))
+                    
+                    # Aberta → Finalizada só se ninguém processou a mala antes
+                    # (outra sessão ou clique duplo): senão nada é gravado
+                    retorno.reservar({m_op[sel]: "Finalizada"}, esperado="Aberta", aba="Malas")
+                    
+                    if retorno.confirmar():
                         st.success("Mala Finalizada!")
                         time.sleep(1.5)
                         st.rerun()
+                    elif m_op[sel] in retorno.conflitos:
+                        atual = retorno.conflitos[m_op[sel]]
+                        st.warning(f"Esta mala já foi processada em outra sessão (status atual: {atual or 'excluída'}). Nada foi gravado.")
+                    else:
+                        st.error("Não foi possível finalizar a mala. Nada foi gravado; tente novamente.")
 
     # --- ABA 3: CANCELAR ---
     with t3:
@@ -188,22 +217,13 @@ def show_malas():
                 
                 if sel_hist:
                     mala_detalhe = hist[hist['id'] == op_hist[sel_hist]].iloc[0]
-                    lista_ids_hist = str(mala_detalhe['lista_ids_produtos']).split(',')
-                    
-                    # Busca nomes dos produtos
-                    itens_nomes = []
-                    valor_estimado = 0
                     
-                    for pid in lista_ids_hist:
-                        prod = df_p[df_p['id'] == pid]
-                        if not prod.empty:
-                            nm = prod['nome'].values[0]
-                            tm = prod['tamanho'].values[0]
-                            vl = ut.converter_input_para_float(prod['preco_venda'].values[0])
-                            itens_nomes.append(f"{nm} ({tm}) - {ut.format_brl(vl)}")
-                            valor_estimado += vl
-                        else:
-                            itens_nomes.append(f"Produto excluído/não encontrado ({pid})")
+                    # Busca nomes dos produtos (todos de uma vez pelo índice)
+                    itens, faltando = itens_da_mala(prod_idx, mala_detalhe['lista_ids_produtos'])
+                    itens_nomes = [f"{nm} ({tm}) - {ut.format_brl(vl)}"
+                                   for nm, tm, vl in zip(itens['nome'], itens['tamanho'], itens['preco_venda'])]
+                    itens_nomes += [f"Produto excluído/não encontrado ({pid})" for pid in faltando]
+                    valor_estimado = itens['preco_venda'].sum()
                     
                     st.write(f"**Total Estimado da Mala:** {ut.format_brl(valor_estimado)}")
                     st.write("**Itens:**")
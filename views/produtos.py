@@ -1,6 +1,7 @@
 import streamlit as st
 import utils as ut
 import database as db
+import busca
 import uuid
 import time
 import pandas as pd
@@ -30,41 +31,34 @@ def show_produtos():
             if nome:
                 c_f = ut.converter_input_para_float(custo)
                 v_f = ut.converter_input_para_float(venda)
-                conn = db.get_connection()
-                if conn:
-                    ws = conn.worksheet("Produtos")
-                    rows = [[str(uuid.uuid4()), nome, tam, f"{c_f:.2f}", f"{v_f:.2f}", "Disponível"] for _ in range(qtd)]
-                    for r in rows: ws.append_row(r)
-                    st.cache_data.clear()
-                st.success(f"{qtd} Produtos Salvos!")
-                time.sleep(1)
-                st.rerun()
+                rows = [[str(uuid.uuid4()), nome, tam, f"{c_f:.2f}", f"{v_f:.2f}", "Disponível"] for _ in range(qtd)]
+                # Todas as peças numa requisição só (ou grava tudo, ou nada)
+                if db.append_data_batch("Produtos", rows):
+                    st.success(f"{qtd} Produtos Salvos!")
+                    time.sleep(1)
+                    st.rerun()
 
     with t2:
         df = db.load_data("Produtos")
         if not df.empty:
-            opts = df[['nome', 'tamanho', 'preco_custo', 'preco_venda']].drop_duplicates(subset=['nome', 'tamanho'])
-            m_opt = {f"{r['nome']} - {r['tamanho']}": r for i, r in opts.iterrows()}
-            sel = st.selectbox("Produto", list(m_opt.keys()))
-            dat = m_opt[sel]
+            sku = busca.caixa_busca("Produto", db.get_busca_skus(), key="rep_sku")
+            if sku is not None:
+                # Lote anterior = primeira linha cadastrada com esse nome/tamanho
+                dat = df[(df['nome'] == sku[0]) & (df['tamanho'] == sku[1])].iloc[0]
             
-            st.divider()
-            st.caption("Valores do lote anterior:")
-            c_v = st.text_input("Custo Novo", value=ut.format_brl(ut.converter_input_para_float(dat['preco_custo'])).replace("R$ ",""))
-            v_v = st.text_input("Venda Nova", value=ut.format_brl(ut.converter_input_para_float(dat['preco_venda'])).replace("R$ ",""))
-            q_v = st.number_input("Qtd Adicional", 1)
+                st.divider()
+                st.caption("Valores do lote anterior:")
+                c_v = st.text_input("Custo Novo", value=ut.format_brl(ut.converter_input_para_float(dat['preco_custo'])).replace("R$ ",""))
+                v_v = st.text_input("Venda Nova", value=ut.format_brl(ut.converter_input_para_float(dat['preco_venda'])).replace("R$ ",""))
+                q_v = st.number_input("Qtd Adicional", 1)
             
-            if st.button("Adicionar Estoque"):
-                cf = ut.converter_input_para_float(c_v)
-                vf = ut.converter_input_para_float(v_v)
-                conn = db.get_connection()
-                if conn:
-                    ws = conn.worksheet("Produtos")
+                if st.button("Adicionar Estoque"):
+                    cf = ut.converter_input_para_float(c_v)
+                    vf = ut.converter_input_para_float(v_v)
                     rows = [[str(uuid.uuid4()), dat['nome'], dat['tamanho'], f"{cf:.2f}", f"{vf:.2f}", "Disponível"] for _ in range(q_v)]
-                    for r in rows: ws.append_row(r)
-                    st.cache_data.clear()
-                st.success("Adicionado!")
-                st.rerun()
+                    if db.append_data_batch("Produtos", rows):
+                        st.success("Adicionado!")
+                        st.rerun()
 
     with t3:
         # --- VISUALIZAÇÃO HIERÁRQUICA (CATEGORIA -> PRODUTOS) ---
@@ -102,8 +96,8 @@ def show_produtos():
                     detalhes.rename(columns={'qtd_real': 'Qtd', 'nome': 'Produto', 'tamanho': 'Tam'}, inplace=True)
                     
                     # Formatação de Moeda
-                    detalhes['Custo'] = detalhes['preco_custo'].apply(lambda x: ut.format_brl(ut.converter_input_para_float(x)))
-                    detalhes['Venda'] = detalhes['preco_venda'].apply(lambda x: ut.format_brl(ut.converter_input_para_float(x)))
+                    detalhes['Custo'] = ut.format_brl_serie(ut.converter_serie_para_float(detalhes['preco_custo']))
+                    detalhes['Venda'] = ut.format_brl_serie(ut.converter_serie_para_float(detalhes['preco_venda']))
                     
                     # Exibe a tabela filha limpa
                     st.dataframe(
@@ -116,25 +110,26 @@ def show_produtos():
 
     with t4:
         if not df.empty:
-            p_opts = {f"{r['nome']} - {r['tamanho']}": r['id'] for i, r in df.iterrows()}
-            sel = st.selectbox("Editar", list(p_opts.keys()))
-            row = df[df['id']==p_opts[sel]].iloc[0]
-            with st.form("ed_p"):
-                nn = st.text_input("Nome", row['nome'])
-                nt = st.selectbox("Tam", ["PP","P","M","G","GG","Único"], index=["PP","P","M","G","GG","Único"].index(row['tamanho']) if row['tamanho'] in ["PP","P","M","G","GG","Único"] else 0)
-                nc = st.text_input("Custo", ut.format_brl(ut.converter_input_para_float(row['preco_custo'])).replace("R$ ",""))
-                nv = st.text_input("Venda", ut.format_brl(ut.converter_input_para_float(row['preco_venda'])).replace("R$ ",""))
-                if st.form_submit_button("Salvar"):
-                    cf = f"{ut.converter_input_para_float(nc):.2f}"
-                    vf = f"{ut.converter_input_para_float(nv):.2f}"
-                    db.update_data("Produtos", p_opts[sel], {2:nn, 3:nt, 4:cf, 5:vf})
-                    st.success("Atualizado!")
-                    st.rerun()
+            busca_p = db.get_busca_produtos()
+            pid = busca.caixa_busca("Editar", busca_p, key="ed_pid")
+            if pid is not None:
+                row = df[df['id'].astype(str)==pid].iloc[0]
+                with st.form("ed_p"):
+                    nn = st.text_input("Nome", row['nome'])
+                    nt = st.selectbox("Tam", ["PP","P","M","G","GG","Único"], index=["PP","P","M","G","GG","Único"].index(row['tamanho']) if row['tamanho'] in ["PP","P","M","G","GG","Único"] else 0)
+                    nc = st.text_input("Custo", ut.format_brl(ut.converter_input_para_float(row['preco_custo'])).replace("R$ ",""))
+                    nv = st.text_input("Venda", ut.format_brl(ut.converter_input_para_float(row['preco_venda'])).replace("R$ ",""))
+                    if st.form_submit_button("Salvar"):
+                        cf = f"{ut.converter_input_para_float(nc):.2f}"
+                        vf = f"{ut.converter_input_para_float(nv):.2f}"
+                        db.update_data("Produtos", pid, {"nome": nn, "tamanho": nt, "preco_custo": cf, "preco_venda": vf})
+                        st.success("Atualizado!")
+                        st.rerun()
 
     with t5:
         if not df.empty:
-            sel_d = st.selectbox("Excluir", list(p_opts.keys()), key='del_p')
-            if st.button("Confirmar Exclusão"):
-                db.delete_data("Produtos", p_opts[sel_d])
+            pid_d = busca.caixa_busca("Excluir", busca_p, key='del_p')
+            if st.button("Confirmar Exclusão", disabled=(pid_d is None)):
+                db.delete_data("Produtos", pid_d)
                 st.success("Excluído!")
                 st.rerun()
\ No newline at end of file
@@ -1,33 +1,25 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import database as db
-import utils as ut
-from datetime import datetime
 
-def show_relatorios():
-    st.header("📈 Relatórios Gerenciais")
-    st.caption("Acompanhe a saúde financeira e operacional da loja.")
-
-    # Carrega dados
-    df_fin = db.load_data("Financeiro")
-    df_prod = db.load_data("Produtos")
-    
-    if df_fin.empty or df_prod.empty:
-        st.info("Sem dados suficientes para gerar gráficos.")
-        return
+# --- ETL (sem Streamlit, usado também pelo benchmark.py) ---
 
-    # --- PROCESSAMENTO DE DADOS (ETL) ---
-    
-    # 1. Preparar Financeiro
-    # Converte colunas numéricas e de data
-    df_fin['valor_float'] = df_fin['valor'].apply(ut.converter_input_para_float)
-    df_fin['data_dt'] = pd.to_datetime(df_fin['data_lancamento'])
+def preparar_financeiro(df_fin):
+    """Colunas auxiliares sobre o Financeiro tipado: valor_float, data_dt e mes_ano."""
+    df_fin = df_fin.copy()
+    # Valor e datas já vêm convertidos do load_typed_data
+    df_fin['valor_float'] = df_fin['valor']
+    df_fin['data_dt'] = df_fin['data_lancamento']
     df_fin['mes_ano'] = df_fin['data_dt'].dt.strftime('%Y-%m') # Ex: 2026-01
-    
-    # 2. Calcular Lucro Real por Mês (DRE Simplificado)
-    # Receitas (Vendas + Entradas) vs Despesas
-    dre = df_fin.groupby(['mes_ano', 'tipo'])['valor_float'].sum().reset_index()
+    return df_fin
+
+def montar_dre(df_fin):
+    """
+    Lucro Real por Mês (DRE Simplificado): Receitas (Vendas + Entradas) vs Despesas.
+    Retorna (dre, dre_pivot): o agrupado mes_ano/tipo e a tabela mes_ano | Venda | Despesa | Lucro.
+    """
+    # observed=True: 'tipo' é categoria, só entram as combinações que existem
+    dre = df_fin.groupby(['mes_ano', 'tipo'], observed=True)['valor_float'].sum().reset_index()
+    dre['tipo'] = dre['tipo'].astype(str) # volta a texto para o pivot aceitar colunas novas
     
     # Pivotar para ter colunas separadas: mes_ano | Despesa | Venda
     dre_pivot = dre.pivot(index='mes_ano', columns='tipo', values='valor_float').fillna(0).reset_index()
@@ -39,6 +31,50 @@ def show_relatorios():
         dre_pivot['Venda'] += dre_pivot['Entrada'] # Soma aportes como entrada positiva
     
     dre_pivot['Lucro'] = dre_pivot['Venda'] - dre_pivot['Despesa']
+    return dre, dre_pivot
+
+def extrair_cliente(desc):
+    """Extrai o nome do cliente da descrição "Venda Direta - Nome (1/X)"."""
+    # Lógica: Pega tudo depois de " - " e antes de " ("
+    try:
+        # Ex: "Venda Direta - Maria Silva (1/2)" -> "Maria Silva"
+        if " - " in desc:
+            parte1 = desc.split(" - ")[1]
+            if " (" in parte1:
+                return parte1.split(" (")[0]
+            return parte1
+        return "Consumidor Final"
+    except:
+        return "Outros"
+
+def ranking_clientes(df_fin, top=10):
+    """Top clientes por valor comprado (ordem crescente, para o gráfico de barras horizontal)."""
+    # Filtra apenas Vendas pagas ou pendentes (ignora despesas)
+    vendas = df_fin[df_fin['tipo'] == 'Venda'].copy()
+    vendas['Cliente_Nome'] = vendas['descricao'].apply(extrair_cliente)
+    
+    # Agrupa e Soma
+    ranking = vendas.groupby('Cliente_Nome')['valor_float'].sum().reset_index()
+    return ranking.sort_values(by='valor_float', ascending=True).tail(top) # Top 10 (tail pq é barra horizontal)
+
+def show_relatorios():
+    # plotly é pesado: só é importado quando a tela de relatórios é aberta
+    import plotly.express as px
+
+    st.header("📈 Relatórios Gerenciais")
+    st.caption("Acompanhe a saúde financeira e operacional da loja.")
+
+    # Carrega dados (já tipados: valor em float, datas em datetime)
+    df_fin = db.load_typed_data("Financeiro")
+    df_prod = db.load_typed_data("Produtos")
+    
+    if df_fin.empty or df_prod.empty:
+        st.info("Sem dados suficientes para gerar gráficos.")
+        return
+
+    # --- PROCESSAMENTO DE DADOS (ETL) ---
+    df_fin = preparar_financeiro(df_fin)
+    dre, dre_pivot = montar_dre(df_fin)
 
     # --- VISUALIZAÇÃO ---
 
@@ -81,28 +117,7 @@ def show_relatorios():
     with t2:
         st.subheader("Quem são suas melhores clientes?")
         
-        # Filtra apenas Vendas pagas ou pendentes (ignora despesas)
-        vendas = df_fin[df_fin['tipo'] == 'Venda']
-        
-        # Extrai nome do cliente da descrição "Venda Direta - Nome (1/X)"
-        # Lógica: Pega tudo depois de " - " e antes de " ("
-        def extrair_cliente(desc):
-            try:
-                # Ex: "Venda Direta - Maria Silva (1/2)" -> "Maria Silva"
-                if " - " in desc:
-                    parte1 = desc.split(" - ")[1]
-                    if " (" in parte1:
-                        return parte1.split(" (")[0]
-                    return parte1
-                return "Consumidor Final"
-            except:
-                return "Outros"
-
-        vendas['Cliente_Nome'] = vendas['descricao'].apply(extrair_cliente)
-        
-        # Agrupa e Soma
-        ranking = vendas.groupby('Cliente_Nome')['valor_float'].sum().reset_index()
-        ranking = ranking.sort_values(by='valor_float', ascending=True).tail(10) # Top 10 (tail pq é barra horizontal)
+        ranking = ranking_clientes(df_fin)
         
         fig_cli = px.bar(
             ranking, 
@@ -124,7 +139,8 @@ def show_relatorios():
         vendidos = df_prod[df_prod['status'] == 'Vendido']
         
         if not vendidos.empty:
-            contagem_tam = vendidos['tamanho'].value_counts().reset_index()
+            contagem_tam = vendidos['tamanho'].value_counts()
+            contagem_tam = contagem_tam[contagem_tam > 0].reset_index()
             contagem_tam.columns = ['Tamanho', 'Qtd Vendida']
             
             # Gráfico de Pizza (Donut)
@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime
 import utils as ut
 import database as db
+import busca
 import uuid
 import time
 
@@ -23,51 +24,38 @@ def show_venda_direta():
     # --- 1. DADOS DA VENDA ---
     c1, c2 = st.columns([2, 1])
     with c1:
-        # Ordena clientes alfabeticamente
-        lista_clientes = sorted(df_c['nome'].unique())
-        cliente = st.selectbox("Cliente", lista_clientes)
+        # Busca no índice de clientes (só as primeiras opções vão para a tela)
+        busca_cli = db.get_busca_clientes()
+        id_cliente = busca.caixa_busca("Cliente", busca_cli, key="vd_cli")
+        cliente = busca_cli.rotulo(id_cliente) if id_cliente else None
     with c2:
         data_venda = st.date_input("Data", datetime.now())
 
     st.divider()
 
     # --- 2. SELEÇÃO DE PRODUTOS (AGRUPADOS) ---
-    # Filtra apenas disponíveis
-    disponiveis = df_p[df_p['status'] == 'Disponível'].copy()
+    # Índice (nome, tamanho) → peças disponíveis, montado uma vez por versão do Produtos
+    # Ex: Se tiver 3 'Calça Jeans M', vira uma opção só com 3 disp.
+    indice = db.get_indice_estoque()
     
-    if not disponiveis.empty:
-        # CRIAR UMA COLUNA 'SKU' PARA AGRUPAR ITENS IGUAIS
-        # Ex: Se tiver 3 'Calça Jeans M', vira uma linha só com Qtd=3
-        disponiveis['sku_display'] = disponiveis['nome'] + " | Tam: " + disponiveis['tamanho']
-        
-        # Agrupa e conta o estoque
-        estoque_agrupado = disponiveis.groupby('sku_display').agg({
-            'id': 'count',                 # Conta quantos tem
-            'preco_venda': 'first',        # Pega o preço do primeiro
-            'nome': 'first',
-            'tamanho': 'first'
-        }).rename(columns={'id': 'qtd_estoque'}).reset_index()
-
+    if len(indice) > 0:
         # Input de Seleção (Busca por Texto)
         c_prod, c_qtd, c_add = st.columns([3, 1, 1])
         
         with c_prod:
-            # Cria lista dropdown: "Calça Jeans | Tam: M (5 em estoque)"
-            opcoes = estoque_agrupado['sku_display'] + " (" + estoque_agrupado['qtd_estoque'].astype(str) + " disp.)"
-            escolha_fmt = st.selectbox("Buscar Produto", options=opcoes, index=None, placeholder="Digite para buscar...")
+            # Só os SKUs que batem com a busca e têm estoque vão para a tela:
+            # "Calça Jeans | Tam: M (5 disp.)"
+            sku_selecionado = busca.caixa_busca("Buscar Produto", db.get_busca_skus(), key="vd_sku",
+                                                formato=lambda sku: f"{indice.rotulo(sku)} ({indice.quantidade(sku)} disp.)",
+                                                aceitar=indice.quantidade)
         
         # Lógica para pegar os dados do item selecionado
         qtd_max = 1
         preco_sugerido = 0.0
-        sku_selecionado = None
         
-        if escolha_fmt:
-            # Reconstrói a chave 'sku_display' tirando a parte do "(X disp.)"
-            sku_selecionado = escolha_fmt.split(" (")[0]
-            dados_prod = estoque_agrupado[estoque_agrupado['sku_display'] == sku_selecionado].iloc[0]
-            
-            qtd_max = int(dados_prod['qtd_estoque'])
-            preco_sugerido = ut.converter_input_para_float(dados_prod['preco_venda'])
+        if sku_selecionado:
+            qtd_max = indice.quantidade(sku_selecionado)
+            preco_sugerido = indice.preco(sku_selecionado)
 
         with c_qtd:
             # O input de quantidade respeita o limite do estoque
@@ -81,9 +69,9 @@ def show_venda_direta():
                 # Adiciona ao carrinho na sessão
                 # Verifica se já não adicionou esse item antes para somar (opcional, aqui cria nova linha)
                 st.session_state['carrinho'].append({
-                    "sku": sku_selecionado,
-                    "nome": dados_prod['nome'],
-                    "tamanho": dados_prod['tamanho'],
+                    "sku": indice.rotulo(sku_selecionado),
+                    "nome": sku_selecionado[0],
+                    "tamanho": sku_selecionado[1],
                     "qtd": qtd_venda,
                     "preco_unit": preco_sugerido,
                     "total": qtd_venda * preco_sugerido
@@ -137,51 +125,49 @@ def show_venda_direta():
                 st.caption(f"Desconto/Ajuste: {ut.format_brl(total_geral - valor_final)}")
             
             st.write("")
-            if st.button("✅ FINALIZAR VENDA", type="primary", use_container_width=True):
+            if cliente is None:
+                st.caption("Escolha a cliente para finalizar.")
+            if st.button("✅ FINALIZAR VENDA", type="primary", use_container_width=True, disabled=(cliente is None)):
                 # --- PROCESSAMENTO MÁGICO ---
                 # Aqui transformamos o Carrinho (Qtd) em IDs Reais do Banco
                 
                 sucesso_global = True
-                lista_ids_para_baixar = {} # Dict {id: 'Vendido'}
                 descricao_venda = f"Venda Direta - {cliente}"
                 
-                # 1. Alocar IDs para cada item do carrinho
-                for item in st.session_state['carrinho']:
-                    # Busca X produtos disponíveis com esse Nome e Tamanho
-                    filtro = (df_p['nome'] == item['nome']) & \
-                             (df_p['tamanho'] == item['tamanho']) & \
-                             (df_p['status'] == 'Disponível')
-                    
-                    ids_disponiveis = df_p[filtro]['id'].head(item['qtd']).values
-                    
-                    if len(ids_disponiveis) < item['qtd']:
-                        st.error(f"Estoque insuficiente para {item['nome']} durante o processamento.")
+                # 1. Alocar IDs para cada item do carrinho (primeiras peças de cada SKU no índice)
+                # 2. Gerar Lançamento Financeiro (ÚNICO para toda a compra)
+                # Usando a função utilitária que já lida com Pix/Datas
+                itens = [((item['nome'], item['tamanho']), item['qtd']) for item in st.session_state['carrinho']]
+                lancs = ut.gerar_lancamentos(
+                    total=valor_final,
+                    parcelas=parcelas,
+                    forma=forma,
+                    cli=cliente,
+                    origem_texto="Venda Loja",
+                    data_base=data_venda,
+                    tipo="Venda" # Receita
+                )
+                
+                # 3. Gravar tudo junto: baixa de estoque (só o que ainda está 'Disponível')
+                # e lançamentos. Se outro caixa levou alguma peça, o índice já sai sem
+                # ela e aloca de novo.
+                confirmado = False
+                for _ in range(3):
+                    indice = db.get_indice_estoque() # O mesmo objeto, a não ser que o cache tenha sido recarregado
+                    lista_ids_para_baixar, sem_estoque = indice.alocar(itens) # Dict {id: 'Vendido'}
+                    if sem_estoque:
+                        st.error(f"Estoque insuficiente para {sem_estoque[0]} durante o processamento.")
                         sucesso_global = False
                         break
-                    
-                    # Adiciona na lista de baixa
-                    for pid in ids_disponiveis:
-                        lista_ids_para_baixar[pid] = "Vendido"
+                    venda = db.Transacao(descricao_venda)
+                    venda.reservar(lista_ids_para_baixar)
+                    venda.incluir("Financeiro", lancs)
+                    confirmado = venda.confirmar()
+                    if confirmado or not venda.conflitos:
+                        break
 
                 if sucesso_global:
-                    # 2. Baixar Estoque em Lote (Batch Update)
-                    if db.update_product_status_batch(lista_ids_para_baixar):
-                        
-                        # 3. Gerar Lançamento Financeiro (ÚNICO para toda a compra)
-                        # Usando a função utilitária que já lida com Pix/Datas
-                        lancs = ut.gerar_lancamentos(
-                            total=valor_final,
-                            parcelas=parcelas,
-                            forma=forma,
-                            cli=cliente,
-                            origem_texto="Venda Loja",
-                            data_base=data_venda,
-                            tipo="Venda" # Receita
-                        )
-                        
-                        for l in lancs:
-                            db.append_data("Financeiro", l)
-                        
+                    if confirmado:
                         st.success("Venda Realizada com Sucesso!")
                         st.balloons()
                         st.session_state['carrinho'] = [] # Limpa carrinho